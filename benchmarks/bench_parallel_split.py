@@ -0,0 +1,67 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Permite executar a partir da raiz do projeto (python benchmarks/bench_parallel_split.py)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_loader import DataLoader
+from src.fitness import FitnessCache, FitnessEvaluator
+from src.parallel import plan_parallelism
+
+
+def candidate_splits(n_cores, n_folds=5):
+    # Todas as divisões (partículas, folds, árvores) em potências de 2 que cabem no orçamento
+    powers = [2 ** i for i in range(int(np.log2(n_cores)) + 1)]
+    for swarm, folds, trees in itertools.product(powers, powers, powers):
+        if swarm * folds * trees <= n_cores and folds <= n_folds:
+            yield (swarm, folds, trees)
+
+
+def run_split(X, y, split, n_cores, points):
+    # Mede avaliações de fitness por segundo para uma divisão de núcleos (cache desativado entre rodadas)
+    plan = plan_parallelism(n_cores, split=split)
+    evaluator = FitnessEvaluator(X, y, FitnessCache(max_size=0), fold_jobs=plan.folds, tree_jobs=plan.trees)
+    start = time.perf_counter()
+    with plan.limits():
+        evaluator.evaluate_batch(points, n_workers=plan.swarm)
+    elapsed = time.perf_counter() - start
+    return {**plan.as_dict(), 'evaluations': len(points), 'seconds': elapsed, 'evals_per_second': len(points) / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avaliações de fitness/s do PSO para diferentes divisões de núcleos.")
+    parser.add_argument('--csv', default=os.path.join(os.path.dirname(__file__), '..', 'data', 'tabelaEnvios.csv'))
+    parser.add_argument('--cores', type=int, default=os.cpu_count())
+    parser.add_argument('--points', type=int, default=16, help="Partículas distintas avaliadas por divisão.")
+    parser.add_argument('--json', help="Grava os resultados neste arquivo JSON.")
+    args = parser.parse_args()
+
+    X, y, _, _ = DataLoader(args.csv).load()
+
+    # Pontos distintos (n_estimators, max_depth) para que nenhuma avaliação seja reaproveitada
+    rng = np.random.default_rng(42)
+    points = np.column_stack([
+        rng.choice(np.arange(1, 101), size=args.points, replace=False),
+        rng.integers(10, 51, size=args.points),
+    ]).astype(float)
+
+    results = []
+    print(f"{'partículas':>10} {'folds':>6} {'árvores':>8} {'aval/s':>10}")
+    for split in candidate_splits(args.cores):
+        result = run_split(X, y, split, args.cores, points)
+        results.append(result)
+        print(f"{result['swarm']:>10} {result['folds']:>6} {result['trees']:>8} {result['evals_per_second']:>10.2f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Permite executar a partir da raiz do projeto (python benchmarks/bench_pipeline.py)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import imblearn
+import pandas as pd
+import sklearn
+from imblearn.over_sampling import SMOTE
+from sklearn.ensemble import RandomForestClassifier
+
+from src.data_loader import DataLoader
+from src.fitness import DEFAULT_FIDELITY_RUNGS, MULTI_FIDELITY_MIN_ROWS, FitnessCache, FitnessEvaluator
+from src.model import FailurePredictor
+from src.parallel import plan_parallelism
+from synthetic import parse_rows, write_csv
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class StageProfiler:
+    # Mede tempo (perf_counter) e pico de memória alocada (tracemalloc) de cada etapa do pipeline.
+    # O tracemalloc enxerga os arrays numpy/pandas, mas não a memória interna das árvores do scikit-learn;
+    # com memory=False só o tempo é medido (o rastreamento deixa o código Python mais lento).
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.stages = {}
+
+    def run(self, name, func, *args, **kwargs):
+        if self.memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            result = {'seconds': round(time.perf_counter() - start, 6)}
+            if self.memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                result['peak_mb'] = round(peak / 2 ** 20, 3)
+            self.stages[name] = result
+            print(f"  {name:<10} {result['seconds']:>10.3f} s" +
+                  (f" {result['peak_mb']:>10.1f} MB" if self.memory else ""))
+
+
+def fixed_points(n_points, seed=42):
+    # Partículas (n_estimators, max_depth) fixas: a mesma carga de trabalho do custo em todos os commits
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(1, 101, size=n_points),
+        rng.integers(10, 51, size=n_points),
+    ]).astype(float)
+
+
+def bench_size(csv_path, n_points, n_estimators, max_depth, memory):
+    # Etapas: load (DataLoader.load), cost (avaliações de fitness do PSO), smote, fit e predict
+    profiler = StageProfiler(memory=memory)
+
+    loader = DataLoader(csv_path)
+    X, y, feature_names, _ = profiler.run('load', loader.load)
+
+    # Mesma configuração do FailurePredictor.train, sem cache entre as partículas
+    plan = plan_parallelism(n_particles=n_points, n_folds=5)
+    use_fidelity = len(y) >= MULTI_FIDELITY_MIN_ROWS
+    evaluator = FitnessEvaluator(
+        X, y, FitnessCache(max_size=0), fold_jobs=plan.folds, tree_jobs=plan.trees,
+        fidelity_rungs=DEFAULT_FIDELITY_RUNGS if use_fidelity else None
+    )
+    with plan.limits():
+        profiler.run('cost', evaluator.evaluate_batch, fixed_points(n_points), n_workers=plan.swarm)
+
+    X_res, y_res = profiler.run('smote', SMOTE(random_state=42).fit_resample, X, y)
+
+    predictor = FailurePredictor()
+    predictor.model = RandomForestClassifier(
+        n_estimators=n_estimators, max_depth=max_depth, random_state=42,
+        n_jobs=plan.n_cores, min_samples_leaf=5, class_weight='balanced'
+    )
+    profiler.run('fit', predictor.model.fit, X_res, y_res)
+    del X_res, y_res
+
+    profiler.run('predict', predictor.predict, X)
+
+    return {
+        'rows': int(X.shape[0]),
+        'features': len(feature_names),
+        'positives': int(np.sum(y)),
+        'csv_mb': round(os.path.getsize(csv_path) / 2 ** 20, 3),
+        'cost_points': n_points,
+        'multi_fidelity': use_fidelity,
+        'stages': profiler.stages,
+    }
+
+
+def environment():
+    # Identifica a execução para comparação entre commits
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'versions': {
+            'numpy': np.__version__, 'pandas': pd.__version__,
+            'scikit-learn': sklearn.__version__, 'imbalanced-learn': imblearn.__version__,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo e memória de cada etapa do pipeline em históricos sintéticos.")
+    parser.add_argument('--sizes', nargs='+', default=['10k', '100k'],
+                        help="Tamanhos dos históricos sintéticos (ex.: 10k 100k 1M 10M).")
+    parser.add_argument('--data-dir', default=os.path.join(BENCH_DIR, 'data'),
+                        help="Onde os CSVs sintéticos são gerados e reaproveitados entre execuções.")
+    parser.add_argument('--points', type=int, default=4, help="Partículas avaliadas na etapa 'cost'.")
+    parser.add_argument('--n-estimators', type=int, default=50)
+    parser.add_argument('--max-depth', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help="Não usa tracemalloc (só tempo).")
+    parser.add_argument('--json', help="Arquivo de saída (padrão: benchmarks/results/pipeline_<commit>_<data>.json).")
+    args = parser.parse_args()
+
+    env = environment()
+    results = []
+    for size in args.sizes:
+        n_rows = parse_rows(size)
+        csv_path = os.path.join(args.data_dir, f"envios_{n_rows}_s{args.seed}.csv")
+        if not os.path.exists(csv_path):
+            print(f"Gerando {n_rows} envios sintéticos em {csv_path}...")
+            write_csv(csv_path, n_rows, seed=args.seed)
+        print(f"{n_rows} linhas:")
+        results.append(bench_size(csv_path, args.points, args.n_estimators, args.max_depth, not args.no_memory))
+
+    output = args.json
+    if output is None:
+        stamp = env['timestamp'].replace(':', '').replace('-', '')
+        output = os.path.join(BENCH_DIR, 'results', f"pipeline_{env['commit'] or 'local'}_{stamp}.json")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({**env, 'seed': args.seed, 'results': results}, f, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {output}")
+
+
+if __name__ == "__main__":
+    main()
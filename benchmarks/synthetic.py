@@ -0,0 +1,188 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Gerador de históricos de envio sintéticos com o MESMO esquema de data/tabelaEnvios.csv,
+# para estudos de escala (10k, 100k, 1M, 10M linhas) do DataLoader, do PSO e da previsão.
+
+COLUNAS = [
+    'ID Envio', 'Nº Série Equip.', 'Placa', 'Tipo', 'Modelo', 'Origem', 'Loja Destino (ID)',
+    'Motivo', 'Data Envio', 'Usuário Envio', '', 'Falha'
+]
+
+TIPOS = [
+    'Nobreak', 'Microcomputador', 'Monitor', 'Multifuncional a laser', 'Leitor de código de barras',
+    'Estabilizador', 'Impressora fiscal', 'Minicomputador', 'Notebook', 'Impressora não fiscal',
+    'Teclado', 'Mouse', 'Roteador', 'Switch', 'Gaveta de dinheiro', 'Balança', 'Servidor',
+    'Leitor de código de baras', 'Pinpad', 'Webcam', 'Tablet'
+]
+# Peso de cada Tipo (Nobreak e Microcomputador dominam, como no histórico real)
+PESOS_TIPO = np.array([24, 16, 9, 8, 8, 6, 4, 3, 3, 3, 2, 2, 2, 1, 1, 1, 1, 2, 1, 1, 1], dtype=float)
+
+LOCAIS = ['do balcão', 'do caixa', 'do servidor', 'da separação', 'da gerência', 'do estoque', 'do PDV']
+
+# Motivos de reenvio (rotulados como Falha pelas palavras-chave do DataLoader)
+MOTIVOS_FALHA = [
+    'Substituir {tipo} {local} que não está segurando carga.',
+    'Substituir {tipo} {local} que deu problema.',
+    'Substituição de {tipo} defasado por este.',
+    'Troca de {tipo} {local} que está apresentando defeito.',
+    'Trocar {tipo} {local} que queimou.',
+    'Reposição de {tipo} {local}.',
+    'Repor {tipo} {local} que parou de funcionar.',
+    'Devolução de {tipo} para conserto.',
+    'Retornar {tipo} após manutenção.',
+]
+# Primeiros envios: inserções em lojas (também contêm palavra-chave) e envios neutros
+MOTIVOS_INSERCAO = [
+    'Inserção de {tipo} para essa nova loja.',
+    'Inserção de {tipo} {local} para loja nova.',
+    'Inserir {tipo} {local}.',
+]
+MOTIVOS_NEUTROS = [
+    'Equipamento devolvido',
+    'Envio de {tipo} para aprimorar loja.',
+    'Remanejamento de {tipo} {local}.',
+    'Empréstimo de {tipo} {local} durante inventário.',
+    'Upgrade de {tipo} {local}: SSD, 8GB de RAM.',
+]
+
+USUARIOS = ['Lucas S.', 'root@localhost', 'ti04', 'ti02', 'suporte']
+
+INICIO = np.datetime64('2018-01-01')
+FIM = np.datetime64('2025-11-21')
+
+
+def _textos(templates, rng, tipos, n):
+    # Motivos a partir de (modelo de frase, Tipo, local): cardinalidade limitada, como no real
+    frases = rng.integers(len(templates), size=n)
+    locais = rng.integers(len(LOCAIS), size=n)
+    tabela = np.array([
+        [[t.format(tipo=tipo.lower(), local=local) for local in LOCAIS] for tipo in TIPOS]
+        for t in templates
+    ], dtype=object)
+    return tabela[frases, tipos, locais]
+
+
+def generate_chunk(n_rows, rng, serial_offset=0, n_lojas=50, n_modelos=128, chronic_share=0.08):
+    # Gera um bloco de ~n_rows envios de números de série novos (a partir de serial_offset).
+    # Cada série tem Tipo/Modelo fixos; séries "crônicas" voltam muitas vezes em intervalos curtos,
+    # as demais seguem o padrão real (maioria com um único envio, poucas com 2-4).
+    # Retorna (DataFrame, número de séries geradas).
+    # Cada série tem ao menos um envio: n_rows séries sempre bastam para completar o bloco
+    n_series = n_rows
+    cronica = rng.random(n_series) < chronic_share
+    envios = np.where(
+        cronica,
+        2 + rng.geometric(0.25, size=n_series),
+        rng.geometric(0.8, size=n_series).clip(max=4)
+    )
+    # Ajusta o total exatamente para n_rows
+    acumulado = np.cumsum(envios)
+    n_series = int(np.searchsorted(acumulado, n_rows) + 1)
+    envios = envios[:n_series]
+    cronica = cronica[:n_series]
+    envios[-1] -= int(acumulado[n_series - 1] - n_rows)
+
+    serie_da_linha = np.repeat(np.arange(n_series), envios)
+    # Posição do envio dentro da série (0 = primeiro envio)
+    inicio_da_serie = np.repeat(np.cumsum(envios) - envios, envios)
+    ordem = np.arange(n_rows) - inicio_da_serie
+
+    # Tipo e Modelo fixos por série; cada Tipo tem a sua faixa de Modelos
+    tipo_serie = rng.choice(len(TIPOS), size=n_series, p=PESOS_TIPO / PESOS_TIPO.sum())
+    modelos_por_tipo = max(1, n_modelos // len(TIPOS))
+    modelo_serie = tipo_serie * modelos_por_tipo + rng.integers(modelos_por_tipo, size=n_series)
+    tipos = tipo_serie[serie_da_linha]
+
+    # DATAS: primeiro envio uniforme no período; reenvios com intervalos exponenciais
+    # (séries crônicas: ~20 dias; demais: ~180 dias)
+    span = int((FIM - INICIO).astype(int))
+    media = np.where(cronica, 20.0, 180.0)[serie_da_linha]
+    intervalo = np.where(ordem == 0, 0, np.ceil(rng.exponential(media)).astype(int))
+    acumulado = np.cumsum(intervalo)
+    dias_na_serie = acumulado - acumulado[inicio_da_serie]
+    # Sorteia o primeiro envio de forma que o histórico inteiro da série caiba no período
+    duracao = dias_na_serie[np.cumsum(envios) - 1]
+    primeiro = (rng.random(n_series) * np.maximum(span - duracao, 1)).astype(int)
+    dias = np.minimum(primeiro[serie_da_linha] + dias_na_serie, span)
+    datas = INICIO + dias.astype('timedelta64[D]')
+
+    # MOTIVOS: reenvios são majoritariamente falhas; primeiros envios, inserções ou neutros
+    reenvio = ordem > 0
+    sorteio = rng.random(n_rows)
+    motivo = np.empty(n_rows, dtype=object)
+    falha = reenvio & (sorteio < 0.85)
+    insercao = ~reenvio & (sorteio < 0.45)
+    neutro = ~(falha | insercao)
+    motivo[falha] = _textos(MOTIVOS_FALHA, rng, tipos[falha], int(falha.sum()))
+    motivo[insercao] = _textos(MOTIVOS_INSERCAO, rng, tipos[insercao], int(insercao.sum()))
+    motivo[neutro] = _textos(MOTIVOS_NEUTROS, rng, tipos[neutro], int(neutro.sum()))
+
+    lojas = rng.integers(1, n_lojas + 1, size=n_rows)
+    origem = np.where(rng.random(n_rows) < 0.35, 999, rng.integers(1, n_lojas + 1, size=n_rows))
+    placa = np.where(rng.random(n_rows) < 0.5, 'Sem placa', rng.integers(10000, 99999, size=n_rows).astype(str))
+
+    df = pd.DataFrame({
+        'ID Envio': 0,
+        'Nº Série Equip.': (serial_offset + serie_da_linha + 10_000_000).astype(str),
+        'Placa': placa,
+        'Tipo': np.array(TIPOS, dtype=object)[tipos],
+        'Modelo': np.char.add('Modelo ', (modelo_serie[serie_da_linha] + 1).astype(str)),
+        'Origem': origem,
+        'Loja Destino (ID)': lojas,
+        'Motivo': motivo,
+        'Data Envio': pd.to_datetime(datas).strftime('%Y-%m-%d'),
+        'Usuário Envio': rng.choice(USUARIOS, size=n_rows, p=[0.8, 0.12, 0.04, 0.02, 0.02]),
+        '': '',
+        'Falha': '',
+    }, columns=COLUNAS)
+    # Ordem do arquivo real: envios mais recentes primeiro
+    df = df.iloc[np.argsort(datas, kind='stable')[::-1]].reset_index(drop=True)
+    return df, n_series
+
+
+def write_csv(path, n_rows, seed=42, chunk_rows=1_000_000, **kwargs):
+    # Grava n_rows envios sintéticos em path, bloco a bloco (memória limitada mesmo para 10M linhas).
+    # Mesma semente e mesmo n_rows -> arquivo idêntico.
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    escritas = 0
+    series = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        while escritas < n_rows:
+            n = min(chunk_rows, n_rows - escritas)
+            df, n_series = generate_chunk(n, rng, serial_offset=series, **kwargs)
+            df['ID Envio'] = np.arange(escritas + 1, escritas + n + 1)
+            df.to_csv(f, index=False, header=(escritas == 0), lineterminator='\r\n')
+            escritas += n
+            series += n_series
+    return path
+
+
+def parse_rows(text):
+    # '10k' -> 10000, '1M' -> 1000000
+    text = str(text).strip().lower()
+    fator = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * fator)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um histórico de envios sintético com o esquema de tabelaEnvios.csv.")
+    parser.add_argument('rows', help="Número de linhas (aceita sufixos k/M, ex.: 100k, 10M).")
+    parser.add_argument('output')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--lojas', type=int, default=50, help="Cardinalidade de 'Loja Destino (ID)'.")
+    parser.add_argument('--modelos', type=int, default=128, help="Cardinalidade aproximada de 'Modelo'.")
+    args = parser.parse_args()
+
+    write_csv(args.output, parse_rows(args.rows), seed=args.seed, n_lojas=args.lojas, n_modelos=args.modelos)
+    print(f"{args.output}: {parse_rows(args.rows)} envios sintéticos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+# Permite executar diretamente (python src/cli.py) a partir da raiz do projeto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Importante: nada de tkinter aqui. A linha de comando precisa funcionar em servidores sem display.
+from src.data_loader import DataLoader
+from src.dataset_cache import DEFAULT_CACHE_DIR, DatasetCache
+from src.feature_store import SerialFeatureStore
+from src.inference import score_csv
+from src.instrumentation import Instrumentation
+from src.model import FailurePredictor
+from src.ranking import DEFAULT_THRESHOLD
+
+
+class Timer:
+    # Acumula tempos (em segundos) por etapa para a saída JSON.
+    def __init__(self):
+        self.timings = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 6)
+
+
+def _emit(result):
+    # Saída legível por máquina: um único objeto JSON no stdout (os logs do pipeline vão para o stderr)
+    json.dump(result, sys.stdout, ensure_ascii=False, default=str)
+    sys.stdout.write("\n")
+
+
+def _instrumentation_from_args(args):
+    # Log estruturado (JSON Lines) e cProfile opcionais; sem as flags, valem as variáveis de ambiente
+    instrumentation = Instrumentation.from_env()
+    if args.trace_log:
+        instrumentation.log_path = args.trace_log
+    if args.profile:
+        instrumentation.profile_path = args.profile
+    return instrumentation
+
+
+def _dataset_cache_dir(args):
+    # Cache em disco do CSV pré-processado (ver src/dataset_cache.py); None desliga
+    return None if args.no_dataset_cache else args.dataset_cache
+
+
+def _feature_store_from_args(args):
+    # Histórico por série persistido entre execuções (ver src/feature_store.py); None = cálculo em lote
+    return SerialFeatureStore.open(args.feature_store) if args.feature_store else None
+
+
+def _save_feature_store(args, store):
+    if store is not None:
+        store.save(args.feature_store)
+
+
+def _predictor_from_args(args, instrumentation=None):
+    return FailurePredictor(cache_dir=args.cache_dir, pso_mode=args.pso_mode, n_cores=args.cores,
+                            n_islands=args.islands, pso_patience=args.pso_patience,
+                            pso_time_budget=args.pso_time_budget, pso_max_evaluations=args.pso_max_evals,
+                            smote_folds=args.smote_folds, search_space=args.search_space,
+                            max_alert_rate=args.max_alert_rate, alert_cost_ratio=args.alert_cost_ratio,
+                            instrumentation=instrumentation)
+
+
+def cmd_train(args):
+    # PSO + SMOTE + treino final; salva o artefato para o comando 'score'.
+    timer = Timer()
+    instrumentation = _instrumentation_from_args(args)
+    with contextlib.redirect_stdout(sys.stderr), instrumentation.profiled():
+        store = _feature_store_from_args(args)
+        loader = DataLoader(args.csv, instrumentation=instrumentation, cache_dir=_dataset_cache_dir(args),
+                            feature_store=store)
+        with timer.stage('load'):
+            X, y, feature_names, _ = loader.load()
+        _save_feature_store(args, store)
+        predictor = _predictor_from_args(args, instrumentation)
+        with timer.stage('train'):
+            metrics = predictor.train(X, y)
+        with timer.stage('save'):
+            predictor.save(
+                args.artifact,
+                preprocessing=loader.preprocessing(),
+                feature_names=feature_names,
+                schema_hash=loader.schema_hash()
+            )
+    _report_profile(instrumentation)
+
+    _emit({
+        'command': 'train',
+        'rows': int(X.shape[0]),
+        'features': len(feature_names),
+        'best_params': predictor.best_params,
+        'metrics': metrics,
+        # A fronteira completa fica em <artefato>/pareto.json
+        'pareto_points': None if predictor.pareto_front is None else len(predictor.pareto_front),
+        'parallel_plan': predictor.parallel_plan.as_dict(),
+        'fitness_cache': predictor.fitness_cache.stats(),
+        'smote_skipped': predictor.smote_skipped,
+        'islands': predictor.pso_islands,
+        'pso_history': predictor.pso_history,
+        'artifact': args.artifact,
+        'timings': timer.timings,
+        'profile': instrumentation.summary(),
+    })
+
+
+def cmd_score(args):
+    # CSV de envios -> CSV de Ranking de Risco (mesmo formato de Ranking_Risco_PSO.csv), sem PSO.
+    timer = Timer()
+    instrumentation = _instrumentation_from_args(args)
+    threshold = args.threshold
+    if threshold is None:
+        # Limiar escolhido no treino (lido só do meta.json) ou o padrão do Ranking de Risco
+        threshold = FailurePredictor.saved_threshold(args.artifact)
+    store = _feature_store_from_args(args)
+    with contextlib.redirect_stdout(sys.stderr), instrumentation.profiled():
+        with timer.stage('score'):
+            ranking = score_csv(args.artifact, args.csv, args.output, threshold=threshold,
+                                instrumentation=instrumentation, chunk_rows=args.chunk_rows,
+                                cache_dir=_dataset_cache_dir(args),
+                                by_serial=args.by_serial, serial_score=args.serial_score, top=args.top,
+                                feature_store=store)
+        _save_feature_store(args, store)
+    _report_profile(instrumentation)
+
+    _emit({
+        'command': 'score',
+        'rows': int(len(ranking)),
+        'threshold': threshold,
+        'by_serial': args.serial_score if args.by_serial else None,
+        'output': args.output,
+        'timings': timer.timings,
+        'profile': instrumentation.summary(),
+    })
+
+
+def cmd_benchmark(args):
+    # Mede carga, treino e previsão do pipeline completo em um CSV (repetido --repeat vezes).
+    # A carga sempre relê o CSV, a menos que --use-dataset-cache peça para medir o caminho com cache.
+    cache_dir = _dataset_cache_dir(args) if args.use_dataset_cache else None
+    runs = []
+    profiles = []
+    for _ in range(args.repeat):
+        timer = Timer()
+        instrumentation = _instrumentation_from_args(args)
+        with contextlib.redirect_stdout(sys.stderr), instrumentation.profiled():
+            loader = DataLoader(args.csv, instrumentation=instrumentation, cache_dir=cache_dir)
+            with timer.stage('load'):
+                X, y, _, _ = loader.load()
+            predictor = _predictor_from_args(args, instrumentation)
+            with timer.stage('train'):
+                predictor.train(X, y)
+            with timer.stage('predict'):
+                predictor.predict(X)
+        _report_profile(instrumentation)
+        runs.append(timer.timings)
+        profiles.append(instrumentation.summary())
+
+    _emit({
+        'command': 'benchmark',
+        'csv': args.csv,
+        'dataset_cache': cache_dir,
+        'rows': int(X.shape[0]),
+        'runs': runs,
+        'best': {stage: min(run[stage] for run in runs) for stage in runs[0]},
+        'profiles': profiles,
+    })
+
+
+def cmd_clear_cache(args):
+    # Apaga as entradas do cache de datasets (--dataset-cache)
+    removed = DatasetCache(args.dataset_cache).clear()
+    _emit({'command': 'clear-cache', 'dataset_cache': args.dataset_cache, 'removed': removed})
+
+
+def _report_profile(instrumentation):
+    # Resumo por etapa no stderr (o stdout fica reservado para o JSON)
+    instrumentation.close()
+    print("Tempo por etapa:", file=sys.stderr)
+    print(instrumentation.format_summary(), file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='cli',
+        description="Predição de Falhas com PSO - execução sem interface gráfica."
+    )
+    parser.add_argument('--trace-log', help="Grava cada etapa instrumentada neste arquivo JSON Lines.")
+    parser.add_argument('--profile', help="Executa sob o cProfile e grava as estatísticas neste arquivo (.prof).")
+    parser.add_argument('--dataset-cache', default=DEFAULT_CACHE_DIR,
+                        help="Diretório do cache do CSV pré-processado (X/y em .npy mapeados em memória).")
+    parser.add_argument('--no-dataset-cache', action='store_true',
+                        help="Sempre relê e pré-processa o CSV (ex.: para medir a carga).")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_training_options(p):
+        p.add_argument('--cache-dir', help="Diretório do cache persistente de fitness do PSO.")
+        p.add_argument('--cores', type=int, default=None, help="Orçamento de núcleos (padrão: todos).")
+        p.add_argument('--pso-mode', choices=['batch', 'async', 'islands'], default='batch')
+        p.add_argument('--islands', type=int, default=4, help="Número de sub-enxames no modo 'islands'.")
+        p.add_argument('--pso-patience', type=int, default=None,
+                       help="Para o PSO após N iterações sem melhora do melhor global (padrão: desligado; "
+                            "não vale para --pso-mode async).")
+        p.add_argument('--pso-time-budget', type=float, default=None, help="Orçamento de tempo do PSO (s).")
+        p.add_argument('--pso-max-evals', type=int, default=None, help="Orçamento de avaliações do PSO.")
+        p.add_argument('--smote-folds', action='store_true',
+                       help="Aplica o SMOTE ao treino de cada fold da validação cruzada do PSO.")
+        p.add_argument('--search-space', choices=['basic', 'extended'], default='basic',
+                       help="'extended' também otimiza min_samples_leaf e max_features e guarda a fronteira de "
+                            "Pareto Recall x alertas x custo de treino.")
+        rule = p.add_mutually_exclusive_group()
+        rule.add_argument('--max-alert-rate', type=float, default=None,
+                          help="Escolhe na fronteira o ponto de maior Recall com no máximo esta fração de envios "
+                               "em alerta e salva o seu limiar (requer --search-space extended --smote-folds).")
+        rule.add_argument('--alert-cost-ratio', type=float, default=None,
+                          help="Escolhe na fronteira o ponto de menor custo, com uma falha não detectada custando N "
+                               "alertas falsos (requer --search-space extended --smote-folds).")
+
+    def add_feature_store_option(p):
+        p.add_argument('--feature-store', metavar='PATH',
+                       help="Store de features por série (.pkl): carregado (se existir), atualizado com os "
+                            "envios do CSV e salvo. O CSV deve conter apenas envios novos em relação ao store.")
+
+    p_train = sub.add_parser('train', help="Otimiza (PSO), treina e salva o artefato do modelo.")
+    p_train.add_argument('csv')
+    p_train.add_argument('artifact', help="Diretório de saída do artefato.")
+    add_feature_store_option(p_train)
+    add_training_options(p_train)
+    p_train.set_defaults(func=cmd_train)
+
+    p_score = sub.add_parser('score', help="Pontua um CSV com um artefato salvo e grava o Ranking de Risco.")
+    p_score.add_argument('artifact')
+    p_score.add_argument('csv')
+    p_score.add_argument('-o', '--output', default='Ranking_Risco_PSO.csv')
+    add_feature_store_option(p_score)
+    p_score.add_argument('--threshold', type=float, default=None,
+                         help="Probabilidade mínima para entrar no ranking (padrão: o limiar escolhido no treino "
+                              f"com --max-alert-rate/--alert-cost-ratio ou {DEFAULT_THRESHOLD}).")
+    p_score.add_argument('--chunk-rows', type=int, default=None,
+                         help="Linhas por bloco na pontuação em lote (padrão: 65536).")
+    p_score.add_argument('--by-serial', action='store_true',
+                         help="Uma linha por equipamento (Nº Série) em vez de uma por envio.")
+    p_score.add_argument('--serial-score', choices=['max', 'latest', 'decayed'], default=None,
+                         help="Risco do equipamento: máximo (padrão), do último envio ou com decaimento "
+                              "(com --by-serial).")
+    p_score.add_argument('--top', type=int, default=None,
+                         help="Mantém apenas os N equipamentos de maior risco (com --by-serial).")
+    p_score.set_defaults(func=cmd_score)
+
+    p_bench = sub.add_parser('benchmark', help="Mede os tempos de carga, treino e previsão.")
+    p_bench.add_argument('csv')
+    p_bench.add_argument('--repeat', type=int, default=1)
+    p_bench.add_argument('--use-dataset-cache', action='store_true',
+                         help="Mede a carga a partir do cache de datasets (padrão: sempre relê o CSV).")
+    add_training_options(p_bench)
+    p_bench.set_defaults(func=cmd_benchmark)
+
+    p_clear = sub.add_parser('clear-cache', help="Apaga o cache de datasets pré-processados.")
+    p_clear.set_defaults(func=cmd_clear_cache)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'score':
+        if not args.by_serial and (args.top is not None or args.serial_score is not None):
+            parser.error("--top e --serial-score só valem com --by-serial.")
+        if args.serial_score is None:
+            args.serial_score = 'max'
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
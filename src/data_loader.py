@@ -1,21 +1,51 @@
 import pandas as pd
 import numpy as np
 import os
-from sklearn.preprocessing import StandardScaler
+import hashlib
+import json
+import codecs
+from pandas.api.types import union_categoricals
+import scipy.sparse as sp
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from src.dataset_cache import DatasetCache
+from src.feature_store import SerialFeatureStore
+from src.instrumentation import Instrumentation
+from src.labeling import KeywordLabeler
 
 class DataLoader:
     # Carrega, pré-processa e aplica Engenharia de Features de Frequência e Temporal.
     # A variável 'Falha' é definida por palavras-chave no Motivo.
 
-    def __init__(self, path):
+    def __init__(self, path, chunksize=100_000, feature_store=None, instrumentation=None, cache_dir=None,
+                 date_format='%Y-%m-%d'):
         self.path = path
+        # Tempos e contadores por etapa (leitura, rotulagem, datas, features, escalonamento, one-hot)
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        # Store incremental das features por número de série (None = calcula só com este CSV)
+        self.feature_store = feature_store
         self.target_coluna = 'Falha'
+        # Linhas por bloco na leitura do CSV (limita o pico de memória)
+        self.chunksize = chunksize
+        self.encoding = None
+        # Formato explícito de 'Data Envio': sem ele o pandas infere um formato por bloco
+        # (dois blocos podem escolher formatos diferentes). Datas fora do formato viram NaT e são descartadas.
+        self.date_format = date_format
+        # Cache em disco do resultado de load() (ver src/dataset_cache.py); None desliga.
+        # Com um feature_store o resultado depende do estado do store, então o cache não é usado.
+        self.cache = DatasetCache(cache_dir) if cache_dir else None
+        self.cache_hit = False
+        self._cached = None
 
         self.falha_keywords = [
-            'substituição', 'substituir', 'troca', 'trocar', 'reposição', 'repor'
+            'substituição', 'substituir', 'troca', 'trocar', 'reposição', 'repor',
             'devolução', 'devolver', 'retornar', 'inserção', 'inserir'
         ]
 
+        self.labeler = KeywordLabeler(self.falha_keywords)
+        # Linhas rotuladas por palavra-chave no último load()
+        self.keyword_hits = {}
+
         # Mantendo 'Motivo' fora desta lista para ser usado no contexto final
         self.colunas_para_remover = [
             'ID Envio', 'Placa', 'Usuário Envio'
@@ -25,59 +55,163 @@ class DataLoader:
             'Tipo', 'Modelo', 'Origem', 'Loja Destino (ID)'
         ]
 
+        # Únicas colunas lidas do CSV; as demais (ex.: 'Usuário Envio') nunca são materializadas
+        self.colunas_usadas = ['Nº Série Equip.', 'Motivo', 'Data Envio'] + self.colunas_categoricas
+
+        # Colunas do CSV usadas e o tipo de cada uma no último load() (base do schema_hash)
+        self.input_schema = None
+
+        # Pré-processamento ajustado no último load() (necessário para salvar o modelo)
+        self.df_raw = None
+        self._df_processed = None
+        self.scaler = None
+        self.encoder = None
+        self.numeric_features = None
+        self.feature_names = None
+
+    @property
+    def df_processed(self):
+        # Vindo do cache, o DataFrame pré-processado só é lido quando necessário (ex.: score_loader)
+        if self._df_processed is None and self._cached is not None:
+            self._df_processed = self._cached.processed()
+        return self._df_processed
+
+    @df_processed.setter
+    def df_processed(self, value):
+        self._df_processed = value
+
+    def _cache_config(self):
+        # Tudo o que muda o resultado de load() além do conteúdo do CSV
+        return {
+            'target': self.target_coluna,
+            'keywords': self.falha_keywords,
+            'categoricas': self.colunas_categoricas,
+            'remover': self.colunas_para_remover,
+            'usadas': self.colunas_usadas,
+            'date_format': self.date_format,
+        }
+
+    def _load_cached(self, cached):
+        # Dataset do cache: X e y mapeados em memória, sem reler o CSV nem refazer o pré-processamento
+        self.cache_hit = True
+        self._cached = cached
+        self.df_raw = None
+        self._df_processed = None
+        preprocessing = cached.preprocessing()
+        self.scaler = preprocessing['scaler']
+        self.encoder = preprocessing['encoder']
+        self.numeric_features = preprocessing['numeric_features']
+        self.feature_names = cached.feature_names
+        self.encoding = cached.meta.get('encoding')
+        self.input_schema = cached.meta.get('input_schema')
+        self.keyword_hits = cached.meta.get('keyword_hits', {})
+        X = cached.X()
+        self.instrumentation.count('load.cache_hits')
+        self.instrumentation.count('load.rows', X.shape[0])
+        return X, cached.y(), list(cached.feature_names), cached.context()
+
+    def _detect_encoding(self):
+        # Detecta a codificação uma única vez, decodificando o arquivo em blocos (sem parsear o CSV).
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        with open(self.path, 'rb') as f:
+            try:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    decoder.decode(block)
+                decoder.decode(b'', final=True)
+            except UnicodeDecodeError:
+                return 'latin1'
+        return 'utf-8'
+
+    def _read_csv(self, **kwargs):
+        # Leitura com tratamento de erros de linha (sintaxe moderna e, como fallback, a antiga).
+        try:
+            return pd.read_csv(self.path, encoding=self.encoding, on_bad_lines='skip', **kwargs)
+        except TypeError:
+            return pd.read_csv(self.path, encoding=self.encoding, error_bad_lines=False, **kwargs)
+
     def _load_data(self):
-        # Carrega o CSV com correção de compatibilidade e tratamento de erros de linha.
+        # Carrega o CSV em blocos de tamanho fixo (chunksize), materializando apenas as colunas usadas.
+        # Texto repetido (Tipo, Modelo, Motivo...) vira 'category' e a data é convertida bloco a bloco (uma
+        # única vez, com self.date_format): o texto bruto de um bloco é descartado antes de ler o próximo.
+        # Os blocos já compactados são mantidos até o concat final, então a memória ainda cresce com o
+        # número de linhas (o DataFrame final é necessário para as features por série).
         if not os.path.exists(self.path):
             raise FileNotFoundError(f"Arquivo CSV não encontrado: {self.path}")
 
-        try:
-            # Tenta sintaxe moderna
-            df = pd.read_csv(self.path, encoding='utf-8', on_bad_lines='skip')
-        except (TypeError, UnicodeDecodeError):
-            try:
-                # Tenta sintaxe antiga
-                df = pd.read_csv(self.path, encoding='utf-8', error_bad_lines=False)
-            except Exception:
-                # Tenta sintaxe antiga com outra codificação
-                df = pd.read_csv(self.path, encoding='latin1', error_bad_lines=False)
+        self.encoding = self._detect_encoding()
+
+        header = self._read_csv(nrows=0).columns
+        usecols = [col for col in self.colunas_usadas if col in header]
+        dtypes = {col: 'str' for col in usecols if col != 'Data Envio'}
+        colunas_texto = [col for col in usecols if col not in ('Nº Série Equip.', 'Data Envio')]
+
+        chunks = []
+        for chunk in self._read_csv(usecols=usecols, dtype=dtypes, chunksize=self.chunksize):
+            for col in colunas_texto:
+                chunk[col] = chunk[col].astype('category')
+            if 'Data Envio' in chunk.columns:
+                with self.instrumentation.stage('load.parse_dates'):
+                    chunk['Data Envio'] = pd.to_datetime(chunk['Data Envio'], format=self.date_format,
+                                                         errors='coerce')
+            chunks.append(chunk)
+            self.instrumentation.count('load.rows_read', len(chunk))
+
+        if not chunks:
+            raise ValueError("O arquivo CSV está vazio ou todas as linhas foram puladas devido a erros.")
+
+        # Une as categorias dos blocos antes de concatenar (categorias diferentes voltariam para texto)
+        for col in colunas_texto:
+            categorias = union_categoricals([chunk[col] for chunk in chunks], sort_categories=True).categories
+            for chunk in chunks:
+                chunk[col] = chunk[col].cat.set_categories(categorias)
+        df = pd.concat(chunks, ignore_index=True)
+        del chunks
 
         if df.empty:
             raise ValueError("O arquivo CSV está vazio ou todas as linhas foram puladas devido a erros.")
 
+        self.input_schema = {col: self._dtype_kind(df[col].dtype) for col in usecols}
         return df
 
+    @staticmethod
+    def _dtype_kind(dtype):
+        # Tipo da coluna independente da versão do pandas ('object' x 'str' para texto)
+        if isinstance(dtype, pd.CategoricalDtype):
+            return 'category'
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return 'datetime'
+        if pd.api.types.is_numeric_dtype(dtype):
+            return 'numeric'
+        return 'text'
+
     def _create_target_and_preprocess(self, df):
         # Cria as features de Falha, Frequência, Intervalo Temporal e pré-processa as colunas.
 
         # 1. CRIAÇÃO DA VARIÁVEL ALVO (Y) - Coluna 'Falha' (via Keywords)
-        keywords_regex = '|'.join(self.falha_keywords)
-        df['Falha'] = df['Motivo'].astype(str).str.lower().str.contains(
-            keywords_regex, na=False
-        ).astype(int)
+        # Rotulagem compilada e sem acentos sobre os Motivos únicos (ver src/labeling.py)
+        with self.instrumentation.stage('load.label'):
+            df['Falha'] = self.labeler.label(df['Motivo'])
+        self.keyword_hits = self.labeler.hit_counts
 
-        # 2. CONVERSÃO DA DATA
+        # 2. DATAS INVÁLIDAS (já convertidas em _load_data com o formato explícito)
         if 'Data Envio' in df.columns:
-            df['Data Envio'] = pd.to_datetime(df['Data Envio'], errors='coerce')
-            df.dropna(subset=['Data Envio'], inplace=True) 
-
-        # 3. ENGENHARIA DA FEATURE DE FREQUÊNCIA DE ENVIO (Reenvio)
-        if 'Nº Série Equip.' in df.columns:
-            contagem_envios = df.groupby('Nº Série Equip.').size().reset_index(name='Frequencia_Envio')
-            df = pd.merge(df, contagem_envios, on='Nº Série Equip.', how='left')
-
-        # 4. ENGENHARIA DA FEATURE DE INTERVALO DE DIAS ENTRE REENVIOS ()
+            with self.instrumentation.stage('load.dates'):
+                invalid = int(df['Data Envio'].isna().sum())
+                if invalid:
+                    print(f"Aviso: {invalid} envios com 'Data Envio' fora do formato {self.date_format} foram descartados.")
+                self.instrumentation.count('load.invalid_dates', invalid)
+                df.dropna(subset=['Data Envio'], inplace=True)
+
+        # 3/4. ENGENHARIA DAS FEATURES DE FREQUÊNCIA DE ENVIO E INTERVALO DE DIAS ENTRE REENVIOS
+        # Calculadas pelo store por número de série: com um store persistido, apenas as séries do
+        # lote atual são atualizadas, sem reagrupar todo o histórico (ver src/feature_store.py)
         if 'Data Envio' in df.columns and 'Nº Série Equip.' in df.columns:
-            # Ordena para garantir que o cálculo do delta seja sequencial
-            df = df.sort_values(by=['Nº Série Equip.', 'Data Envio'])
-
-            # Calcula a data de envio ANTERIOR
-            df['Data_Envio_Anterior'] = df.groupby('Nº Série Equip.')['Data Envio'].shift(1)
-
-            # Calcula a diferença em dias
-            df['Intervalo_Dias_Reenvio'] = (df['Data Envio'] - df['Data_Envio_Anterior']).dt.days
-
-            # Remoção temporária de colunas de data/referência para o próximo passo
-            df = df.drop(columns=['Data_Envio_Anterior'])
+            store = self.feature_store if self.feature_store is not None else SerialFeatureStore()
+            with self.instrumentation.stage('load.serial_features'):
+                df = store.update(df)
+            if (df['Frequencia_Envio'] < 0).any():
+                # Salvaguarda: uma contagem inválida distorceria toda a coluna no escalonamento
+                raise ValueError("Frequencia_Envio negativa calculada pelo store de features por série.")
 
             # Features de Data baseadas no envio atual (Serão removidas no .load())
             df['Dia_da_Semana'] = df['Data Envio'].dt.dayofweek.fillna(0).astype(int)
@@ -105,20 +239,112 @@ class DataLoader:
             errors='ignore'
         )
 
-        # 6. ONE-HOT ENCODING (Categoricas)
-        cols_ohe = [col for col in self.colunas_categoricas if col in df_processado.columns]
-        df_final = pd.get_dummies(df_processado, columns=cols_ohe, dummy_na=False)
+        # 6. CATEGÓRICAS: mantidas como 'category'; a codificação one-hot esparsa é feita em build_features()
+        df_final = df_processado
 
-        # 7. GARANTE QUE TODOS OS DADOS SÃO NUMÉRICOS E TRATA RESTANTES VALORES NULOS
-        df_final.fillna(0, inplace=True)
+        # 7. TRATA RESTANTES VALORES NULOS DAS COLUNAS NUMÉRICAS
+        colunas_numericas = df_final.select_dtypes(include=[np.number]).columns
+        df_final[colunas_numericas] = df_final[colunas_numericas].fillna(0)
 
         return df_final
 
 
-    def load(self):
+    def schema_hash(self):
+        # Impressão digital das colunas de ENTRADA (as do CSV usadas e seus tipos) e da configuração do
+        # pré-processamento. Um artefato salvo só pode pontuar CSVs com o mesmo esquema de entrada.
+        # (O layout de features não entra: na pontuação ele sai do próprio encoder do artefato.)
+        if self.input_schema is None:
+            raise ValueError("O DataLoader precisa ser carregado (load()) antes de calcular o esquema.")
+        schema = {
+            'input': self.input_schema,
+            'target': self.target_coluna,
+            'keywords': self.falha_keywords,
+            'categoricas': self.colunas_categoricas,
+            'remover': self.colunas_para_remover,
+        }
+        return hashlib.sha1(json.dumps(schema, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def preprocessing(self):
+        # Pré-processamento ajustado no último load(), no formato aceito por build_features()/load()
+        return {'scaler': self.scaler, 'encoder': self.encoder, 'numeric_features': self.numeric_features}
+
+    def build_features(self, scaler=None, encoder=None, numeric_features=None):
+        # Monta a matriz esparsa X (CSR) a partir de self.df_processed:
+        # features numéricas padronizadas + one-hot esparso das categóricas (vocabulário do OneHotEncoder).
+        # Com o pré-processamento de um modelo salvo, o layout de colunas é o do treino:
+        # categorias novas viram linhas zeradas em vez de deslocar as colunas.
+        # O pré-processamento usado passa a ser o do loader (é o que save_model grava).
+        X, feature_names, scaler, encoder, numeric_features = self._features(scaler, encoder, numeric_features)
+        self.scaler = scaler
+        self.encoder = encoder
+        self.numeric_features = list(numeric_features)
+        self.feature_names = feature_names
+        return X, feature_names
+
+    def transform(self, scaler, encoder, numeric_features):
+        # X com o pré-processamento de um modelo salvo SEM alterar o estado do loader
+        # (o scaler/encoder ajustados no load() continuam sendo os do CSV carregado)
+        X, feature_names, _, _, _ = self._features(scaler, encoder, numeric_features)
+        return X, feature_names
+
+    def _features(self, scaler, encoder, numeric_features):
+        colunas_sazonalidade_a_remover = ['Mes', 'Dia_da_Semana']
+
+        # Cria um DataFrame temporário sem o target e as colunas de sazonalidade
+        df_temp_features = self.df_processed.drop(
+            columns=[self.target_coluna] + colunas_sazonalidade_a_remover, errors='ignore'
+        )
+
+        # Filtra apenas colunas numéricas (int, float) para garantir que não haja strings
+        # O resultado NÃO conterá 'Mes' e 'Dia_da_Semana'
+        if numeric_features is None:
+            numeric_features = df_temp_features.select_dtypes(include=[np.number]).columns.tolist()
+        X_num = df_temp_features.reindex(columns=numeric_features, fill_value=0).to_numpy(dtype=np.float64)
+
+        # Usa StandardScaler para Padronizar (mitigar picos) APENAS as features numéricas:
+        # escalonar os 0/1 do one-hot tornaria a matriz densa
+        with self.instrumentation.stage('load.scale'):
+            if scaler is None:
+                scaler = StandardScaler()
+                X_num = scaler.fit_transform(X_num)
+            else:
+                X_num = scaler.transform(X_num)
+
+        # ONE-HOT ENCODING ESPARSO (Categoricas)
+        cols_ohe = [col for col in self.colunas_categoricas if col in df_temp_features.columns]
+        with self.instrumentation.stage('load.encode'):
+            if encoder is None:
+                encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=True, dtype=np.float32)
+                X_cat = encoder.fit_transform(df_temp_features[cols_ohe])
+            else:
+                X_cat = encoder.transform(df_temp_features.reindex(columns=encoder.feature_names_in_))
+
+            X = sp.hstack([sp.csr_matrix(X_num.astype(np.float32)), X_cat], format='csr')
+        feature_names = list(numeric_features) + encoder.get_feature_names_out().tolist()
+        return X, feature_names, scaler, encoder, numeric_features
+
+    def load(self, scaler=None, encoder=None, numeric_features=None):
         #Carrega, pré-processa, aplica escalonamento e retorna X, y, feature_names e colunas de contexto.
-        df_raw = self._load_data()
-        self.df_processed = self._create_target_and_preprocess(df_raw.copy())
+        # scaler/encoder/numeric_features: reutiliza o pré-processamento de um modelo salvo (modo de inferência).
+        self.cache_hit = False
+        self._cached = None
+        cache_key = None
+        if self.cache is not None and self.feature_store is None:
+            given = None
+            if scaler is not None or encoder is not None or numeric_features is not None:
+                given = {'scaler': scaler, 'encoder': encoder, 'numeric_features': numeric_features}
+            with self.instrumentation.stage('load.cache'):
+                cache_key = self.cache.key(self.path, self._cache_config(), given)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return self._load_cached(cached)
+
+        with self.instrumentation.stage('load.read'):
+            df_raw = self._load_data()
+        # Cópia rasa: o pré-processamento só adiciona/substitui colunas, sem alterar df_raw
+        with self.instrumentation.stage('load.preprocess'):
+            self.df_processed = self._create_target_and_preprocess(df_raw.copy(deep=False))
+        self.df_raw = df_raw
 
         if self.target_coluna not in self.df_processed.columns:
             raise ValueError("Erro de pré-processamento: A coluna 'Falha' (target) não foi criada.")
@@ -135,22 +361,14 @@ class DataLoader:
         y = self.df_processed[self.target_coluna].values
 
         # --- MUDANÇA CRÍTICA AQUI: REMOÇÃO DA SAZONALIDADE ---
-        colunas_sazonalidade_a_remover = ['Mes', 'Dia_da_Semana']
-        
-        # Cria um DataFrame temporário sem o target e as colunas de sazonalidade
-        df_temp_features = self.df_processed.drop(
-            columns=[self.target_coluna] + colunas_sazonalidade_a_remover, errors='ignore'
-        )
-
-        # Filtra apenas colunas numéricas (int, float) para garantir que não haja strings
-        # O resultado NÃO conterá 'Mes' e 'Dia_da_Semana'
-        df_features = df_temp_features.select_dtypes(include=[np.number])
-
-        feature_names = df_features.columns.tolist()
-        X = df_features.values
+        X, feature_names = self.build_features(scaler=scaler, encoder=encoder, numeric_features=numeric_features)
+        self.instrumentation.count('load.rows', X.shape[0])
 
-        # Usa StandardScaler para Padronizar (mitigar picos)
-        scaler = StandardScaler()
-        X = scaler.fit_transform(X)
+        if cache_key is not None:
+            with self.instrumentation.stage('load.cache_write'):
+                self.cache.put(cache_key, X, y, feature_names, colunas_contexto, self.df_processed,
+                               self.preprocessing(),
+                               extra={'encoding': self.encoding, 'keyword_hits': self.keyword_hits,
+                                      'input_schema': self.input_schema})
 
-        return X, y, feature_names, colunas_contexto
\ No newline at end of file
+        return X, y, feature_names, colunas_contexto
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Parquet (colunar) quando o pyarrow está instalado; sem ele, os DataFrames vão para pickle
+try:
+    import pyarrow  # noqa: F401
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+# Versão do formato das entradas (incrementar ao mudar o que é gravado ou o pré-processamento do DataLoader)
+CACHE_VERSION = 3
+
+# Diretório padrão (na raiz do projeto, fora do controle de versão)
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'datasets')
+
+# Tamanho máximo do diretório do cache: acima dele, as entradas usadas há mais tempo são removidas
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+class CachedDataset:
+    # Entrada do cache aberta: X (CSR) e y são montados sobre arquivos .npy mapeados em memória (mmap_mode='r');
+    # o contexto e o DataFrame pré-processado só são lidos quando pedidos.
+
+    def __init__(self, path, mmap_mode='r'):
+        self.path = path
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+    def _array(self, name):
+        return np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode=self.mmap_mode, allow_pickle=False)
+
+    def _frame(self, name):
+        if self.meta['frames'] == 'parquet':
+            return pd.read_parquet(os.path.join(self.path, f'{name}.parquet'))
+        return pd.read_pickle(os.path.join(self.path, f'{name}.pkl'))
+
+    @property
+    def feature_names(self):
+        return self.meta['feature_names']
+
+    def X(self):
+        # Sem cópia: a matriz CSR aponta para os arrays mapeados (somente leitura)
+        shape = tuple(self.meta['shape'])
+        return sp.csr_matrix((self._array('X_data'), self._array('X_indices'), self._array('X_indptr')),
+                             shape=shape, copy=False)
+
+    def y(self):
+        return self._array('y')
+
+    def context(self):
+        return self._frame('context').to_numpy(dtype=object)
+
+    def processed(self):
+        return self._frame('processed')
+
+    def preprocessing(self):
+        return joblib.load(os.path.join(self.path, 'preprocessing.joblib'))
+
+
+class DatasetCache:
+    # Cache em disco do resultado de DataLoader.load(): X, y, nomes das features, colunas de contexto,
+    # o DataFrame pré-processado e o pré-processamento ajustado (scaler/encoder).
+    # A chave é o hash do CONTEÚDO do CSV + a configuração do DataLoader (+ o pré-processamento de um modelo
+    # salvo, no modo de inferência): CSV ou configuração alterados geram outra chave, e a entrada antiga
+    # simplesmente deixa de ser usada. Cada entrada é um diretório gravado de forma atômica.
+    # O diretório é limitado a max_bytes (LRU pela data de último uso de cada entrada); clear() apaga tudo.
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, mmap_mode='r', max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.mmap_mode = mmap_mode
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def file_hash(path, block_size=1 << 20):
+        # Hash do conteúdo do CSV em blocos (não carrega o arquivo inteiro)
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def key(self, csv_path, config, preprocessing=None):
+        payload = {
+            'version': CACHE_VERSION,
+            'csv': self.file_hash(csv_path),
+            'config': config,
+            'preprocessing': None if preprocessing is None else joblib.hash(preprocessing),
+        }
+        return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:20]
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        path = self.entry_path(key)
+        try:
+            dataset = CachedDataset(path, mmap_mode=self.mmap_mode)
+        except (OSError, ValueError):
+            return None
+        if dataset.meta.get('version') != CACHE_VERSION:
+            return None
+        # Último uso da entrada (ordem de remoção do LRU)
+        try:
+            os.utime(os.path.join(path, 'meta.json'))
+        except OSError:
+            pass
+        return dataset
+
+    def entries(self):
+        # (último uso, bytes, caminho) de cada entrada completa do diretório
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(path, 'meta.json')
+            if '.tmp-' in name or not os.path.exists(meta_path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+            entries.append((os.path.getmtime(meta_path), size, path))
+        return entries
+
+    def prune(self, keep=None):
+        # Remove as entradas usadas há mais tempo até o diretório caber em max_bytes (keep nunca é removida).
+        # Uma entrada ainda mapeada por outro processo pode não sair no Windows: é ignorada e tentada de novo.
+        if self.max_bytes is None:
+            return 0
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            if not os.path.exists(path):
+                total -= size
+                removed += 1
+        return removed
+
+    def clear(self):
+        # Apaga todas as entradas (e restos de gravações interrompidas); retorna quantas foram removidas
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+                removed += not os.path.exists(path)
+        return removed
+
+    def put(self, key, X, y, feature_names, context_cols, processed, preprocessing, extra=None):
+        # Grava em um diretório temporário e renomeia: leitores nunca veem uma entrada pela metade
+        path = self.entry_path(key)
+        tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        os.makedirs(tmp)
+        try:
+            X = sp.csr_matrix(X)
+            np.save(os.path.join(tmp, 'X_data.npy'), X.data)
+            np.save(os.path.join(tmp, 'X_indices.npy'), X.indices)
+            np.save(os.path.join(tmp, 'X_indptr.npy'), X.indptr)
+            np.save(os.path.join(tmp, 'y.npy'), np.asarray(y))
+
+            context = pd.DataFrame(np.asarray(context_cols, dtype=object), columns=['serial', 'motivo'])
+            frames = 'parquet' if HAS_PARQUET else 'pickle'
+            for name, frame in (('context', context), ('processed', processed)):
+                if HAS_PARQUET:
+                    frame.to_parquet(os.path.join(tmp, f'{name}.parquet'))
+                else:
+                    frame.to_pickle(os.path.join(tmp, f'{name}.pkl'))
+            joblib.dump(preprocessing, os.path.join(tmp, 'preprocessing.joblib'))
+
+            meta = {
+                'version': CACHE_VERSION,
+                'shape': list(X.shape),
+                'feature_names': list(feature_names),
+                'frames': frames,
+                **(extra or {}),
+            }
+            with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+            try:
+                os.replace(tmp, path)
+            except OSError:
+                # Outro processo gravou a mesma entrada primeiro (mesmo conteúdo)
+                if not os.path.isdir(path):
+                    raise
+                shutil.rmtree(tmp, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.prune(keep=path)
+        return path
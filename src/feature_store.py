@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class SerialFeatureStore:
+    # Estado persistente por 'Nº Série Equip.' para as features de reenvio (Frequencia_Envio e
+    # Intervalo_Dias_Reenvio). Um lote novo de envios atualiza apenas os números de série afetados:
+    # o histórico antigo não é relido nem reagrupado.
+    # Com o store vazio, update(df) reproduz exatamente o cálculo em lote do DataLoader.
+
+    SERIAL = 'Nº Série Equip.'
+    DATE = 'Data Envio'
+    COLUMNS = ['count', 'first_date', 'last_date', 'interval_sum', 'interval_count']
+
+    def __init__(self, state=None):
+        if state is None:
+            state = pd.DataFrame(
+                {
+                    'count': pd.Series(dtype='int64'),
+                    'first_date': pd.Series(dtype='datetime64[ns]'),
+                    'last_date': pd.Series(dtype='datetime64[ns]'),
+                    'interval_sum': pd.Series(dtype='float64'),
+                    'interval_count': pd.Series(dtype='int64'),
+                },
+                index=pd.Index([], dtype=object, name=self.SERIAL),
+            )
+        self.state = state
+
+    def __len__(self):
+        return len(self.state)
+
+    def update(self, df):
+        # Calcula as features dos envios em df usando o estado acumulado e incorpora df ao estado.
+        # df precisa de 'Nº Série Equip.' e 'Data Envio' (datetime, sem nulos); os envios novos devem ser
+        # posteriores ao último envio registrado de cada série. Retorna df ordenado por (série, data)
+        # com as colunas 'Frequencia_Envio' e 'Intervalo_Dias_Reenvio'.
+        # Envios sem número de série não pertencem a nenhum histórico: Frequencia_Envio = 0 e intervalo
+        # ausente (como no cálculo original, preenchidos com 0 no DataLoader), e ficam fora do estado.
+        df = df.sort_values(by=[self.SERIAL, self.DATE], kind='stable')
+        serials = df[self.SERIAL]
+        dates = df[self.DATE].astype('datetime64[ns]')
+        grouped = dates.groupby(serials.values, sort=False)
+
+        # Estado anterior apenas das séries presentes no lote (consulta por hash, O(linhas novas))
+        known = self.state.reindex(pd.unique(serials.values))
+        prev_count = known['count'].reindex(serials.values).fillna(0).to_numpy()
+        prev_last = known['last_date'].reindex(serials.values).to_numpy()
+
+        # FREQUÊNCIA DE ENVIO: total de envios da série até este lote (histórico + lote)
+        missing = serials.isna().to_numpy()
+        batch_count = grouped.transform('size').to_numpy()
+        df['Frequencia_Envio'] = np.where(missing, 0, prev_count + np.nan_to_num(batch_count)).astype(int)
+
+        # INTERVALO ENTRE REENVIOS: envio anterior no lote ou, para o primeiro do lote, o último do histórico
+        previous = grouped.shift(1).to_numpy(copy=True)
+        first_in_batch = pd.isna(previous)
+        previous[first_in_batch] = prev_last[first_in_batch]
+        df['Intervalo_Dias_Reenvio'] = (dates - previous).dt.days.to_numpy()
+
+        self._absorb(serials, dates, df['Intervalo_Dias_Reenvio'])
+        return df
+
+    def _absorb(self, serials, dates, intervals):
+        # Acumula o lote no estado: contagem, primeira/última data e soma dos intervalos por série.
+        batch = pd.DataFrame({
+            'count': dates.groupby(serials.values).size(),
+            'first_date': dates.groupby(serials.values).min(),
+            'last_date': dates.groupby(serials.values).max(),
+            'interval_sum': intervals.groupby(serials.values).sum(),
+            'interval_count': intervals.groupby(serials.values).count(),
+        })
+        batch.index.name = self.SERIAL
+
+        existing = batch.index.isin(self.state.index)
+        if existing.any():
+            rows = batch.index[existing]
+            old = self.state.loc[rows]
+            new = batch.loc[rows]
+            self.state.loc[rows, 'count'] = old['count'] + new['count']
+            self.state.loc[rows, 'first_date'] = np.minimum(old['first_date'], new['first_date'])
+            self.state.loc[rows, 'last_date'] = np.maximum(old['last_date'], new['last_date'])
+            self.state.loc[rows, 'interval_sum'] = old['interval_sum'] + new['interval_sum']
+            self.state.loc[rows, 'interval_count'] = old['interval_count'] + new['interval_count']
+        if (~existing).any():
+            novos = batch.loc[~existing, self.COLUMNS]
+            self.state = novos if self.state.empty else pd.concat([self.state, novos])
+
+    def mean_interval(self):
+        # Intervalo médio entre reenvios por série (NaN para séries com um único envio).
+        return self.state['interval_sum'] / self.state['interval_count'].replace(0, np.nan)
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.state.to_pickle(path)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Store de features não encontrado: {path}")
+        return cls(pd.read_pickle(path))
+
+    @classmethod
+    def open(cls, path):
+        # Store persistido em path ou, na primeira execução, um store vazio (gravado depois com save(path))
+        return cls.load(path) if os.path.exists(path) else cls()
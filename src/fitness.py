@@ -0,0 +1,785 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+from joblib import Parallel, delayed, parallel_config
+from imblearn.over_sampling import SMOTE
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import recall_score
+from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test_split
+
+from src.instrumentation import Instrumentation
+
+
+def dataset_fingerprint(X, y, extra=None):
+    # Gera uma impressão digital (hash) do conjunto de dados e da configuração da função de custo.
+    # Qualquer alteração no CSV (e portanto em X/y) ou no objetivo invalida o cache persistido.
+    h = hashlib.sha1()
+    # Matrizes esparsas (CSR) são identificadas pelos seus três arrays internos
+    arrays = [X.data, X.indices, X.indptr] if sp.issparse(X) else [X]
+    h.update(str(X.shape).encode())
+    for arr in arrays + [y]:
+        arr = np.ascontiguousarray(arr)
+        h.update(str(arr.shape).encode())
+        h.update(str(arr.dtype).encode())
+        h.update(arr.tobytes())
+    if extra is not None:
+        h.update(json.dumps(extra, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:16]
+
+
+class FitnessCache:
+    # Cache LRU das avaliações de fitness do PSO, indexado pela tupla discretizada de hiperparâmetros.
+    # Opcionalmente persiste em disco (JSON), separado por impressão digital do conjunto de dados.
+
+    def __init__(self, max_size=256, cache_dir=None, fingerprint=None):
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+        if self.path is not None and os.path.exists(self.path):
+            self._load()
+
+    @property
+    def path(self):
+        if self.cache_dir is None or self.fingerprint is None:
+            return None
+        return os.path.join(self.cache_dir, f"fitness_{self.fingerprint}.json")
+
+    @staticmethod
+    def _encode_key(key):
+        return ",".join(str(k) for k in key)
+
+    @staticmethod
+    def _decode_key(text):
+        return tuple(int(k) for k in text.split(","))
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            # Arquivo corrompido ou ilegível: começa com cache vazio
+            return
+        for key, score in stored.items():
+            self._entries[self._decode_key(key)] = float(score)
+        self._evict()
+
+    def save(self):
+        # Grava as entradas atuais no disco (apenas se a persistência estiver configurada).
+        if self.path is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({self._encode_key(k): v for k, v in self._entries.items()}, f)
+        os.replace(tmp_path, self.path)
+
+    def _evict(self):
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        # Retorna a pontuação em cache (ou None) e atualiza os contadores de acerto/falha.
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, score):
+        self._entries[key] = float(score)
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._entries),
+        }
+
+
+# Degraus de fidelidade (successive halving) usados antes da avaliação completa (5 folds, todas as linhas e árvores).
+# rows: fração estratificada das linhas, folds: número de folds, trees: teto de árvores da floresta.
+DEFAULT_FIDELITY_RUNGS = [
+    {'rows': 0.1, 'folds': 3, 'trees': 10},
+    {'rows': 0.3, 'folds': 3, 'trees': 30},
+]
+
+# Tamanho de conjunto a partir do qual o modo multi-fidelidade é ativado automaticamente
+MULTI_FIDELITY_MIN_ROWS = 20000
+
+
+# ESPAÇO DE BUSCA ESTENDIDO (MultiObjectiveEvaluator): n_estimators, max_depth, min_samples_leaf e o índice de
+# max_features em MAX_FEATURES_CHOICES. O limiar de decisão não é uma dimensão do PSO: as probabilidades
+# fora do fold (OOF) de cada ponto são calculadas uma vez e todos os limiares de THRESHOLD_GRID são avaliados.
+MAX_FEATURES_CHOICES = ('sqrt', 'log2', 0.25, 0.5)
+EXTENDED_BOUNDS = [(1.0, 100.0), (10.0, 50.0), (1.0, 20.0), (0.0, float(len(MAX_FEATURES_CHOICES)))]
+THRESHOLD_GRID = np.round(np.arange(0.05, 0.951, 0.01), 2)
+
+
+def _build_forest(n_estimators, max_depth, tree_jobs=1, warm_start=False, min_samples_leaf=5, max_features='sqrt'):
+    return RandomForestClassifier(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        random_state=42,
+        n_jobs=tree_jobs,
+        # AUMENTO DE REGULARIZAÇÃO: Impede folhas com poucas amostras, suavizando a previsão
+        min_samples_leaf=min_samples_leaf,
+        max_features=max_features,
+        # Ponderação de classe no PSO
+        class_weight='balanced',
+        warm_start=warm_start
+    )
+
+
+def _read_only(matrix):
+    # Marca os buffers (densos ou esparsos) como somente leitura: os folds são compartilhados entre avaliações
+    arrays = [matrix.data, matrix.indices, matrix.indptr] if sp.issparse(matrix) else [matrix]
+    for array in arrays:
+        array.setflags(write=False)
+    return matrix
+
+
+class FoldCache:
+    # Folds estratificados pré-calculados: os índices de StratifiedKFold (os mesmos de cross_val_score(cv=cv))
+    # são gerados uma vez e os arrays de treino/teste de cada fold são materializados uma única vez, contíguos
+    # e somente leitura (treino em CSC, formato usado pelas árvores; teste em CSR), na primeira vez que o
+    # fold é pedido. Todas as partículas reaproveitam os mesmos buffers, sem fatiar X de novo.
+    # Com smote=True, o treino de cada fold é reamostrado com SMOTE (como no treino final do FailurePredictor),
+    # também uma única vez por fold.
+    # Em workers de processos (loky), os arrays grandes chegam como memmap somente leitura, sem cópia por tarefa;
+    # os folds são materializados no processo principal antes do envio (ver FitnessEvaluator._cross_validate),
+    # então smote_skipped também é contado nele.
+
+    def __init__(self, X, y, cv=5, smote=False):
+        self.X = X
+        self.y = np.asarray(y)
+        self.cv = cv
+        self.smote = smote
+        self.splits = list(StratifiedKFold(n_splits=cv).split(X, self.y))
+        self._folds = [None] * cv
+        # Um lock por fold: a materialização (e o SMOTE) de um fold não bloqueia as threads dos outros
+        self._locks = [threading.Lock() for _ in range(cv)]
+        # Folds em que o SMOTE não pôde ser aplicado (ex.: poucos exemplos da classe minoritária)
+        self.smote_skipped = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_locks']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._locks = [threading.Lock() for _ in range(self.cv)]
+
+    def __len__(self):
+        return self.cv
+
+    def _materialize(self, i):
+        train_idx, test_idx = self.splits[i]
+        X_train, y_train = self.X[train_idx], self.y[train_idx]
+        X_test, y_test = self.X[test_idx], self.y[test_idx]
+        if self.smote:
+            try:
+                X_train, y_train = SMOTE(random_state=42).fit_resample(X_train, y_train)
+            except ValueError:
+                self.smote_skipped += 1
+        if sp.issparse(X_train):
+            # O treino das árvores usa CSC e a previsão CSR
+            X_train = X_train.tocsc()
+            X_test = X_test.tocsr()
+        else:
+            X_train = np.ascontiguousarray(X_train)
+            X_test = np.ascontiguousarray(X_test)
+        return (_read_only(X_train), _read_only(np.ascontiguousarray(y_train)),
+                _read_only(X_test), _read_only(np.ascontiguousarray(y_test)))
+
+    def fold(self, i):
+        # (X_train, y_train, X_test, y_test) do fold i
+        fold = self._folds[i]
+        if fold is None:
+            with self._locks[i]:
+                fold = self._folds[i]
+                if fold is None:
+                    fold = self._folds[i] = self._materialize(i)
+        return fold
+
+
+def cv_cost(X, y, n_estimators, max_depth, fold_jobs=1, tree_jobs=1, cv=5, folds=None):
+    # FUNÇÃO DE CUSTO: 1 - Recall médio da validação cruzada (para minimização).
+    # fold_jobs/tree_jobs vêm do ParallelPlan: folds e árvores nunca usam -1 ao mesmo tempo.
+    # folds: FoldCache com os folds já materializados (sem ele, cross_val_score recorta X a cada chamada).
+    try:
+        if folds is not None:
+            def run_fold(i):
+                X_train, y_train, X_test, y_test = folds.fold(i)
+                model = _build_forest(n_estimators, max_depth, tree_jobs=tree_jobs).fit(X_train, y_train)
+                return recall_score(y_test, model.predict(X_test), zero_division=0)
+
+            scores = Parallel(n_jobs=fold_jobs, backend='threading')(delayed(run_fold)(i) for i in range(len(folds)))
+            return 1 - np.mean(scores)
+
+        model = _build_forest(n_estimators, max_depth, tree_jobs=tree_jobs)
+
+        # Validação Cruzada usando RECALL
+        scores = cross_val_score(model, X, y, cv=cv, scoring='recall', n_jobs=fold_jobs, error_score='raise')
+
+        # Retornamos 1 - Recall (para minimização)
+        return 1 - np.mean(scores)
+    except Exception:
+        return 99999.0
+
+
+class ForestPool:
+    # Cache LRU limitado de florestas já treinadas, indexado por (fidelidade, max_depth, fold).
+    # Uma floresta de 60 árvores é a de 40 mais 20: com warm_start só as árvores novas são treinadas,
+    # e um n_estimators menor apenas trunca a lista estimators_ (random_state fixo => mesmas árvores).
+
+    def __init__(self, max_forests=40):
+        self.max_forests = max_forests
+        # Identifica o pool entre processos (ver _worker_pool): cópias enviadas a workers mantêm o mesmo token
+        self.token = uuid.uuid4().hex
+        self._forests = OrderedDict()
+        self._lock = threading.Lock()
+        self.trees_fitted = 0
+        self.trees_reused = 0
+
+    def __getstate__(self):
+        # As florestas são locais ao processo: uma cópia enviada a outro processo (IslandPSO) começa vazia
+        state = self.__dict__.copy()
+        state['_forests'] = OrderedDict()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def forest(self, key, X_train, y_train, n_estimators, max_depth, tree_jobs=1):
+        # Retorna uma floresta com exatamente n_estimators árvores para o fold indicado.
+        with self._lock:
+            forest = self._forests.get(key)
+            if forest is not None:
+                self._forests.move_to_end(key)
+
+        if forest is None:
+            forest = _build_forest(n_estimators, max_depth, tree_jobs=tree_jobs, warm_start=True)
+        grown = len(getattr(forest, 'estimators_', []))
+
+        if grown < n_estimators:
+            forest.set_params(n_estimators=n_estimators, n_jobs=tree_jobs)
+            with warnings.catch_warnings():
+                # Os dados do fold são sempre os mesmos, então o aviso de class_weight + warm_start não se aplica
+                warnings.simplefilter('ignore', UserWarning)
+                forest.fit(X_train, y_train)
+            self.trees_fitted += n_estimators - grown
+            self.trees_reused += grown
+        else:
+            self.trees_reused += n_estimators
+
+        with self._lock:
+            self._forests[key] = forest
+            self._forests.move_to_end(key)
+            while len(self._forests) > self.max_forests:
+                self._forests.popitem(last=False)
+
+        if len(forest.estimators_) == n_estimators:
+            return forest
+        # Visão truncada: cópia rasa que compartilha as árvores já treinadas
+        view = copy.copy(forest)
+        view.estimators_ = forest.estimators_[:n_estimators]
+        view.n_estimators = n_estimators
+        return view
+
+
+# Pools de florestas residentes nos workers de processos, indexados pelo token do pool do processo principal.
+# Os workers do loky persistem entre as iterações do PSO: cada um mantém as florestas dos grupos que já avaliou.
+_WORKER_POOLS = {}
+
+
+def _worker_pool(token, max_forests):
+    pool = _WORKER_POOLS.get(token)
+    if pool is None:
+        # Um treinamento novo substitui as florestas do anterior (não acumula memória no worker)
+        _WORKER_POOLS.clear()
+        pool = _WORKER_POOLS[token] = ForestPool(max_forests=max_forests)
+    return pool
+
+
+def worker_warm_cv_costs(token, max_forests, X, y, max_depth, n_estimators_list, fold_jobs=1, tree_jobs=1, cv=5,
+                         tag=None, folds=None):
+    # warm_cv_costs em um worker de processo, com o pool residente desse worker.
+    # Retorna (custos, árvores treinadas, árvores reaproveitadas) para o processo principal somar os contadores.
+    pool = _worker_pool(token, max_forests)
+    fitted, reused = pool.trees_fitted, pool.trees_reused
+    costs = warm_cv_costs(X, y, max_depth, n_estimators_list, fold_jobs, tree_jobs, cv=cv, pool=pool, tag=tag,
+                          folds=folds)
+    return costs, pool.trees_fitted - fitted, pool.trees_reused - reused
+
+
+def warm_cv_costs(X, y, max_depth, n_estimators_list, fold_jobs=1, tree_jobs=1, cv=5, pool=None, tag=None,
+                  folds=None):
+    # Custo (1 - Recall médio) de vários n_estimators com o mesmo max_depth, crescendo as florestas
+    # de cada fold de forma incremental. Usa os mesmos folds estratificados de cross_val_score(cv=cv).
+    # Sem pool as florestas vivem apenas durante esta chamada (workers de processos usam worker_warm_cv_costs).
+    # folds: FoldCache compartilhado entre chamadas (sem ele, os folds são recortados só para esta chamada).
+    if pool is None:
+        pool = ForestPool(max_forests=cv)
+    try:
+        if folds is None:
+            folds = FoldCache(X, y, cv=cv)
+        recalls = np.zeros((len(n_estimators_list), len(folds)))
+
+        def run_fold(i):
+            X_train, y_train, X_test, y_test = folds.fold(i)
+            # Ordem crescente: cada floresta só acrescenta árvores
+            for j in np.argsort(n_estimators_list, kind='stable'):
+                forest = pool.forest((tag, max_depth, i), X_train, y_train, n_estimators_list[j], max_depth, tree_jobs)
+                recalls[j, i] = recall_score(y_test, forest.predict(X_test), zero_division=0)
+
+        Parallel(n_jobs=fold_jobs, backend='threading')(delayed(run_fold)(i) for i in range(len(folds)))
+        return list(1 - recalls.mean(axis=1))
+    except Exception:
+        return [99999.0] * len(n_estimators_list)
+
+
+def threshold_sweep(y, proba, thresholds=THRESHOLD_GRID, beta=2.0):
+    # Métricas de todos os limiares de uma vez, sem novos treinos: as probabilidades são ordenadas UMA vez,
+    # o número de alertas de cada limiar sai de uma busca binária e os verdadeiros positivos de uma soma acumulada.
+    y = np.asarray(y, dtype=int)
+    thresholds = np.asarray(thresholds, dtype=float)
+    order = np.argsort(-proba, kind='stable')
+    neg_sorted = -proba[order]
+    true_positives = np.concatenate([[0], np.cumsum(y[order])])
+    alerts = np.searchsorted(neg_sorted, -thresholds, side='right')
+    tp = true_positives[alerts].astype(float)
+    zeros = np.zeros(len(thresholds))
+    recall = tp / max(int(true_positives[-1]), 1)
+    precision = np.divide(tp, alerts, out=zeros.copy(), where=alerts > 0)
+    # F-beta (beta > 1 favorece o Recall): objetivo escalar do PSO no espaço estendido
+    b2 = beta ** 2
+    denominator = b2 * precision + recall
+    fbeta = np.divide((1 + b2) * precision * recall, denominator, out=zeros.copy(), where=denominator > 0)
+    return {
+        'threshold': thresholds,
+        'recall': recall,
+        'precision': precision,
+        'alert_rate': alerts / max(len(y), 1),
+        'fbeta': fbeta,
+    }
+
+
+def oof_trial(folds, params, tree_jobs=1, fold_jobs=1, thresholds=THRESHOLD_GRID, beta=2.0):
+    # Avalia um ponto do espaço estendido: uma floresta por fold produz as probabilidades fora do fold
+    # de todas as linhas e a varredura de limiares escolhe o que maximiza o F-beta.
+    # Retorna o custo (1 - F-beta) e as métricas do limiar escolhido, junto com o tempo total de treino dos folds.
+    n_estimators, max_depth, min_samples_leaf, max_features = params
+    y = folds.y
+    proba = np.zeros(len(y))
+    fit_seconds = np.zeros(len(folds))
+    try:
+        def run_fold(i):
+            X_train, y_train, X_test, _ = folds.fold(i)
+            model = _build_forest(n_estimators, max_depth, tree_jobs=tree_jobs, min_samples_leaf=min_samples_leaf,
+                                  max_features=MAX_FEATURES_CHOICES[max_features])
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            fit_seconds[i] = time.perf_counter() - start
+            proba[folds.splits[i][1]] = model.predict_proba(X_test)[:, list(model.classes_).index(1)]
+
+        Parallel(n_jobs=fold_jobs, backend='threading')(delayed(run_fold)(i) for i in range(len(folds)))
+    except Exception:
+        return {'cost': 99999.0}
+
+    sweep = threshold_sweep(y, proba, thresholds, beta)
+    best = int(np.argmax(sweep['fbeta']))
+    return {
+        'cost': float(1 - sweep['fbeta'][best]),
+        'threshold': float(sweep['threshold'][best]),
+        'recall': float(sweep['recall'][best]),
+        'precision': float(sweep['precision'][best]),
+        'alert_rate': float(sweep['alert_rate'][best]),
+        'fit_seconds': float(fit_seconds.sum()),
+        'sweep': sweep,
+    }
+
+
+def pareto_front(candidates):
+    # Fronteira de Pareto: maximiza 'recall' e minimiza 'alert_rate' e 'fit_seconds'.
+    # Um candidato sai se outro é pelo menos tão bom nos três objetivos e estritamente melhor em um.
+    if not candidates:
+        return []
+    objectives = np.array([[-c['recall'], c['alert_rate'], c['fit_seconds']] for c in candidates])
+    # Ordem lexicográfica: um candidato só pode ser dominado por outro que vem antes dele
+    order = np.lexsort(objectives.T[::-1])
+    front = []
+    for i in order:
+        if front:
+            kept = objectives[front]
+            dominated = np.all(kept <= objectives[i], axis=1) & np.any(kept < objectives[i], axis=1)
+            if dominated.any() or np.all(kept == objectives[i], axis=1).any():
+                continue
+        front.append(i)
+    return [candidates[i] for i in front]
+
+
+def select_threshold(candidates, positive_rate, max_alert_rate=None, cost_ratio=None):
+    # Escolhe um candidato (hiperparâmetros + limiar) por uma regra explícita de operação:
+    # max_alert_rate: maior Recall com no máximo essa fração de envios em alerta;
+    # cost_ratio: menor custo esperado por envio, com uma falha não detectada custando cost_ratio alertas falsos.
+    # As duas regras só melhoram com mais Recall e menos alertas, então o ótimo está na fronteira de Pareto.
+    # Retorna None se nenhum candidato cabe no orçamento de alertas.
+    if max_alert_rate is not None:
+        feasible = [c for c in candidates if c['alert_rate'] <= max_alert_rate]
+        if not feasible:
+            return None
+        return min(feasible, key=lambda c: (-c['recall'], c['alert_rate'], c['fit_seconds']))
+    if cost_ratio is not None:
+        def expected_cost(c):
+            missed = (1 - c['recall']) * positive_rate
+            false_alerts = max(c['alert_rate'] - c['recall'] * positive_rate, 0.0)
+            return cost_ratio * missed + false_alerts
+        return min(candidates, key=lambda c: (expected_cost(c), c['fit_seconds']))
+    return None
+
+
+class FitnessEvaluator:
+    # Função de fitness do PSO: discretiza a partícula, consulta o cache e avalia apenas pontos inéditos.
+    # Pode ser chamada partícula a partícula (modo assíncrono) ou para o enxame inteiro (evaluate_batch).
+    # Com fidelity_rungs, o lote passa por degraus baratos (successive halving) e só as partículas
+    # promissoras chegam à validação cruzada completa.
+    # Com warm_start, as florestas de cada (max_depth, fold) são reaproveitadas entre partículas.
+    # Os folds de cada fidelidade ficam em um FoldCache; com smote_folds, o treino de cada fold é
+    # reamostrado com SMOTE, como no treino final (o objetivo do PSO passa a medir o mesmo pipeline).
+
+    def __init__(self, X, y, cache, fold_jobs=1, tree_jobs=1, fidelity_rungs=None, eta=3, promote_margin=0.02,
+                 warm_start=True, max_forests=40, instrumentation=None, smote_folds=False):
+        self.X = X
+        self.y = y
+        self.cache = cache
+        # Paralelismo interno de cada avaliação (ver ParallelPlan em src/parallel.py)
+        self.fold_jobs = fold_jobs
+        self.tree_jobs = tree_jobs
+
+        # MULTI-FIDELIDADE
+        self.fidelity_rungs = fidelity_rungs or []
+        self.eta = eta
+        self.promote_margin = promote_margin
+        self._rung_data = [self._subsample(rung) for rung in self.fidelity_rungs]
+        self._rung_cache = FitnessCache(max_size=cache.max_size)
+        self.promotions = 0
+        self.early_stops = 0
+
+        # CRESCIMENTO INCREMENTAL DAS FLORESTAS
+        self.warm_start = warm_start
+        self.forest_pool = ForestPool(max_forests=max_forests) if warm_start else None
+
+        # FOLDS PRÉ-CALCULADOS (um FoldCache por fidelidade, criado na primeira avaliação)
+        self.smote_folds = smote_folds
+        self._fold_caches = {}
+
+        # Tempo das validações cruzadas por fidelidade (ver src/instrumentation.py)
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+
+    def _subsample(self, rung):
+        # Amostra estratificada fixa (mesmas linhas para todas as partículas do degrau)
+        n_rows = len(self.y)
+        n_sub = int(n_rows * rung['rows'])
+        minority = np.bincount(np.asarray(self.y, dtype=int)).min()
+        if rung['rows'] >= 1.0 or minority * rung['rows'] < rung['folds']:
+            return self.X, self.y
+        X_sub, _, y_sub, _ = train_test_split(
+            self.X, self.y, train_size=n_sub, random_state=42, stratify=self.y
+        )
+        return X_sub, y_sub
+
+    def _fidelity(self, rung_index):
+        # Dados, número de folds e teto de árvores da avaliação completa (None) ou de um degrau
+        if rung_index is None:
+            return self.X, self.y, 5, None
+        rung = self.fidelity_rungs[rung_index]
+        X_sub, y_sub = self._rung_data[rung_index]
+        return X_sub, y_sub, rung['folds'], rung['trees']
+
+    def fold_cache(self, rung_index=None):
+        # Folds da fidelidade (split calculado uma vez; arrays de cada fold materializados uma vez)
+        folds = self._fold_caches.get(rung_index)
+        if folds is None:
+            X, y, cv, _ = self._fidelity(rung_index)
+            folds = self._fold_caches[rung_index] = FoldCache(X, y, cv=cv, smote=self.smote_folds)
+        return folds
+
+    def smote_skipped(self):
+        # Folds (de todas as fidelidades) treinados sem SMOTE porque a reamostragem falhou
+        return sum(folds.smote_skipped for folds in self._fold_caches.values())
+
+    def materialize_folds(self):
+        # Materializa os folds de todas as fidelidades (ex.: antes de gravar o avaliador para outros processos)
+        for rung_index in [None] + list(range(len(self.fidelity_rungs))):
+            folds = self.fold_cache(rung_index)
+            for i in range(len(folds)):
+                folds.fold(i)
+
+    def _run(self, keys, n_workers, backend, rung_index=None):
+        # Avalia uma lista de (n_estimators, max_depth) em uma fidelidade e retorna os custos na mesma ordem.
+        if not keys:
+            return []
+        stage = 'fitness.cv' if rung_index is None else f'fitness.cv_rung{rung_index}'
+        with self.instrumentation.stage(stage, points=len(keys)):
+            costs = self._cross_validate(keys, n_workers, backend, rung_index)
+        self.instrumentation.count('fitness.cv_points', len(keys))
+        return costs
+
+    def _cross_validate(self, keys, n_workers, backend, rung_index=None):
+        X, y, cv, tree_cap = self._fidelity(rung_index)
+        folds = self.fold_cache(rung_index)
+        fold_jobs = min(self.fold_jobs, cv)
+        specs = [(min(n, tree_cap) if tree_cap else n, depth) for n, depth in keys]
+
+        if n_workers > 1 and len(specs) > 1 and backend != 'threading':
+            # Materializa os folds antes de enviá-los aos processos: cada worker recebe os arrays prontos
+            # (memmap somente leitura do joblib), em vez de recortá-los de novo a cada tarefa
+            for i in range(len(folds)):
+                folds.fold(i)
+
+        if not self.warm_start:
+            tasks = [delayed(cv_cost)(X, y, n, depth, fold_jobs=fold_jobs, tree_jobs=self.tree_jobs, cv=cv,
+                                      folds=folds)
+                     for n, depth in specs]
+            if n_workers == 1 or len(tasks) == 1:
+                return [func(*args, **kwargs) for func, args, kwargs in tasks]
+            with parallel_config(backend=backend, inner_max_num_threads=self.fold_jobs * self.tree_jobs):
+                return Parallel(n_jobs=n_workers)(tasks)
+
+        # Agrupa por max_depth: cada grupo cresce as mesmas florestas em ordem crescente de n_estimators
+        groups = OrderedDict()
+        for position, (n, depth) in enumerate(specs):
+            groups.setdefault(depth, []).append((position, n))
+
+        if n_workers == 1 or len(groups) == 1 or backend == 'threading':
+            # Mesmo processo: o pool de florestas persiste entre iterações do PSO
+            def run_group(depth, items):
+                return warm_cv_costs(X, y, depth, [n for _, n in items], fold_jobs, self.tree_jobs,
+                                     cv=cv, pool=self.forest_pool, tag=rung_index, folds=folds)
+            if n_workers == 1 or len(groups) == 1:
+                group_costs = [run_group(depth, items) for depth, items in groups.items()]
+            else:
+                group_costs = Parallel(n_jobs=n_workers, backend='threading')(
+                    delayed(run_group)(depth, items) for depth, items in groups.items()
+                )
+        else:
+            # Processos separados: cada worker mantém um pool residente (ver _worker_pool), então o
+            # reaproveitamento é por worker: um grupo só reutiliza as florestas que o mesmo processo já treinou
+            pool = self.forest_pool
+            with parallel_config(backend=backend, inner_max_num_threads=self.fold_jobs * self.tree_jobs):
+                results = Parallel(n_jobs=n_workers)(
+                    delayed(worker_warm_cv_costs)(pool.token, pool.max_forests, X, y, depth, [n for _, n in items],
+                                                  fold_jobs, self.tree_jobs, cv=cv, tag=rung_index, folds=folds)
+                    for depth, items in groups.items()
+                )
+            group_costs = []
+            for values, fitted, reused in results:
+                group_costs.append(values)
+                pool.trees_fitted += fitted
+                pool.trees_reused += reused
+
+        costs = [None] * len(specs)
+        for items, values in zip(groups.values(), group_costs):
+            for (position, _), value in zip(items, values):
+                costs[position] = value
+        return costs
+
+    @staticmethod
+    def key(params):
+        n_estimators = max(1, int(params[0]))
+        depth = max(1, int(params[1]))
+        return (n_estimators, depth)
+
+    def __call__(self, params):
+        key = self.key(params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self.instrumentation.stage('fitness.call'):
+            score = self._run([key], n_workers=1, backend='loky')[0]
+        if score < 99999.0:
+            self.cache.put(key, score)
+        return score
+
+    def _successive_halving(self, pending, references, n_workers, backend):
+        # Avalia os pontos pendentes degrau a degrau. Em cada degrau sobem as partículas que podem
+        # superar seu pbest (score <= referência + margem) e, no mínimo, o melhor 1/eta do lote.
+        # Retorna {key: score}; as descartadas recebem +inf: custos de baixa fidelidade (amostra de linhas,
+        # poucas árvores) nunca viram pbest/gbest, só os da validação cruzada completa.
+        results = {}
+        survivors = list(pending)
+        for rung_index in range(len(self.fidelity_rungs)):
+            scores = {}
+            to_run = []
+            for key in survivors:
+                cached = self._rung_cache.get((rung_index,) + key)
+                if cached is not None:
+                    scores[key] = cached
+                else:
+                    to_run.append(key)
+            for key, score in zip(to_run, self._run(to_run, n_workers, backend, rung_index)):
+                scores[key] = score
+                self._rung_cache.put((rung_index,) + key, score)
+
+            ranked = sorted(survivors, key=lambda k: scores[k])
+            keep = set(ranked[:int(np.ceil(len(ranked) / self.eta))])
+            keep.update(k for k in survivors if scores[k] <= references[k] + self.promote_margin)
+
+            for key in survivors:
+                if key not in keep:
+                    results[key] = np.inf
+                    self.early_stops += 1
+            survivors = [k for k in survivors if k in keep]
+            self.promotions += len(survivors)
+
+        for key, score in zip(survivors, self._run(survivors, n_workers, backend)):
+            results[key] = score
+            if score < 99999.0:
+                self.cache.put(key, score)
+        return results
+
+    def evaluate_batch(self, positions, n_workers=1, backend='loky', incumbents=None):
+        # Avalia o enxame inteiro: pontos repetidos (no cache ou no próprio lote) são calculados uma única vez
+        # e os restantes são distribuídos entre n_workers processos/threads.
+        # incumbents: pbest_scores atuais de cada partícula, usados como referência de promoção.
+        with self.instrumentation.stage('fitness.batch', points=len(positions)):
+            return self._evaluate_batch(positions, n_workers, backend, incumbents)
+
+    def _evaluate_batch(self, positions, n_workers, backend, incumbents):
+        keys = [self.key(p) for p in positions]
+        results = {}
+        pending = []
+        for key in keys:
+            if key in results:
+                self.cache.hits += 1
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                results[key] = None
+                pending.append(key)
+
+        if pending and self.fidelity_rungs:
+            # Referência de cada ponto: o pbest mais permissivo entre as partículas que caíram nele.
+            # Partículas sem pbest completo (+inf, descartadas até agora) só sobem pelo ranking do degrau.
+            references = {key: -np.inf for key in pending}
+            if incumbents is not None:
+                for key, incumbent in zip(keys, incumbents):
+                    if key in references and np.isfinite(incumbent):
+                        references[key] = max(references[key], incumbent)
+            results.update(self._successive_halving(pending, references, n_workers, backend))
+        elif pending:
+            for key, score in zip(pending, self._run(pending, n_workers, backend)):
+                results[key] = score
+                if score < 99999.0:
+                    self.cache.put(key, score)
+
+        return np.array([results[key] for key in keys])
+
+
+class MultiObjectiveEvaluator(FitnessEvaluator):
+    # Função de fitness do espaço de busca estendido (n_estimators, max_depth, min_samples_leaf, max_features).
+    # Cada ponto inédito é validado UMA vez (probabilidades fora do fold, ver oof_trial); o limiar de decisão
+    # é escolhido por varredura vetorizada sobre essas probabilidades, sem novos treinos.
+    # O PSO minimiza 1 - F-beta (beta=2 favorece o Recall) e cada avaliação fica em trials para a
+    # fronteira de Pareto de Recall x volume de alertas x custo de treino.
+    # Sem multi-fidelidade nem florestas incrementais: min_samples_leaf e max_features mudam as árvores.
+
+    def __init__(self, X, y, cache, fold_jobs=1, tree_jobs=1, instrumentation=None, smote_folds=False,
+                 thresholds=THRESHOLD_GRID, beta=2.0):
+        super().__init__(X, y, cache, fold_jobs=fold_jobs, tree_jobs=tree_jobs, warm_start=False,
+                         instrumentation=instrumentation, smote_folds=smote_folds)
+        self.thresholds = thresholds
+        self.beta = beta
+        self.trials = {}
+
+    @staticmethod
+    def key(params):
+        n_estimators = max(1, int(params[0]))
+        depth = max(1, int(params[1]))
+        leaf = max(1, int(params[2]))
+        max_features = min(max(0, int(params[3])), len(MAX_FEATURES_CHOICES) - 1)
+        return (n_estimators, depth, leaf, max_features)
+
+    @staticmethod
+    def params(key):
+        # Hiperparâmetros do RandomForestClassifier correspondentes a uma chave
+        n_estimators, depth, leaf, max_features = key
+        return {'n_estimators': n_estimators, 'max_depth': depth, 'min_samples_leaf': leaf,
+                'max_features': MAX_FEATURES_CHOICES[max_features]}
+
+    def _cross_validate(self, keys, n_workers, backend, rung_index=None):
+        folds = self.fold_cache()
+        fold_jobs = min(self.fold_jobs, len(folds))
+        tasks = [delayed(oof_trial)(folds, key, self.tree_jobs, fold_jobs, self.thresholds, self.beta) for key in keys]
+        if n_workers == 1 or len(tasks) == 1:
+            trials = [func(*args, **kwargs) for func, args, kwargs in tasks]
+        else:
+            for i in range(len(folds)):
+                folds.fold(i)
+            with parallel_config(backend=backend, inner_max_num_threads=self.fold_jobs * self.tree_jobs):
+                trials = Parallel(n_jobs=n_workers)(tasks)
+        for key, trial in zip(keys, trials):
+            if trial['cost'] < 99999.0:
+                self.trials[key] = trial
+        return [trial['cost'] for trial in trials]
+
+    def trial(self, key):
+        # Avaliação completa de um ponto (refeita se o custo veio do cache persistente, que guarda só o escalar)
+        if key not in self.trials:
+            self._run([key], n_workers=1, backend='loky')
+        return self.trials.get(key)
+
+    def candidates(self):
+        # Todos os pares (ponto, limiar) avaliados, cada um com Recall, volume de alertas e custo de treino
+        candidates = []
+        for key, trial in self.trials.items():
+            sweep = trial['sweep']
+            for i, threshold in enumerate(sweep['threshold']):
+                candidates.append({
+                    **self.params(key),
+                    'threshold': float(threshold),
+                    'recall': float(sweep['recall'][i]),
+                    'precision': float(sweep['precision'][i]),
+                    'alert_rate': float(sweep['alert_rate'][i]),
+                    'fit_seconds': trial['fit_seconds'],
+                })
+        return candidates
+
+    def pareto_front(self):
+        # Fronteira ordenada por Recall decrescente
+        return sorted(pareto_front(self.candidates()), key=lambda c: (-c['recall'], c['alert_rate']))
+
+    def select_threshold(self, front, max_alert_rate=None, cost_ratio=None):
+        # Ponto de operação da fronteira pela regra pedida (ver select_threshold)
+        positive_rate = float(np.mean(np.asarray(self.y) == 1))
+        return select_threshold(front, positive_rate, max_alert_rate=max_alert_rate, cost_ratio=cost_ratio)
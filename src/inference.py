@@ -0,0 +1,112 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Permite executar diretamente (python src/inference.py) a partir da raiz do projeto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_loader import DataLoader
+from src.instrumentation import Instrumentation
+from src.model import FailurePredictor
+from src.ranking import RiskRanking, SerialRiskIndex
+
+
+def _check_schema(predictor, loader):
+    # Compara as colunas de entrada do CSV (e seus tipos) com as do treinamento do artefato
+    if loader.schema_hash() != predictor.schema_hash:
+        raise ValueError(
+            "O esquema do CSV/pré-processamento difere do usado no treinamento do modelo salvo."
+        )
+
+
+def score_loader(predictor, loader):
+    # Gera o Ranking de Risco de um DataLoader já carregado usando o pré-processamento do artefato.
+    if loader.df_processed is None:
+        raise ValueError("O DataLoader precisa ser carregado (load()) antes da pontuação.")
+
+    _check_schema(predictor, loader)
+    # transform() não altera o loader: um treino/salvamento posterior continua com o pré-processamento do CSV
+    X, _ = loader.transform(**predictor.preprocessing)
+    return predictor.predict(X)
+
+
+def score_csv(artifact_path, csv_path, output_path=None, mmap_mode='r', threshold=None, instrumentation=None,
+              chunk_rows=None, cache_dir=None, by_serial=False, serial_score='max', top=None,
+              feature_store=None):
+    # Caminho de inferência rápida: carrega o artefato salvo, pré-processa o CSV e pontua, sem PSO/SMOTE.
+    # Retorna o ranking (Nº Série Equip., Motivo, Probabilidade_Risco) ordenado por risco decrescente,
+    # opcionalmente apenas com os envios de probabilidade >= threshold.
+    # chunk_rows: linhas por bloco da pontuação em lote (ver src/scoring.py).
+    # cache_dir: cache do CSV pré-processado com o pré-processamento do artefato (ver src/dataset_cache.py).
+    # by_serial: uma linha por equipamento (ver SerialRiskIndex), ordenada por serial_score e limitada a top.
+    # feature_store: SerialFeatureStore com o histórico por série; é atualizado com os envios do CSV.
+    if instrumentation is None:
+        instrumentation = Instrumentation()
+    predictor = FailurePredictor.load(artifact_path, mmap_mode=mmap_mode, instrumentation=instrumentation)
+    if chunk_rows:
+        predictor.predict_chunk_rows = chunk_rows
+
+    loader = DataLoader(csv_path, instrumentation=instrumentation, cache_dir=cache_dir, feature_store=feature_store)
+    X, _, feature_names, context_cols = loader.load(**predictor.preprocessing)
+    _check_schema(predictor, loader)
+    if by_serial:
+        # A agregação precisa de todos os envios de cada série (contagem, último envio), não só dos alertas
+        probabilities = predictor.predict(X)
+        with instrumentation.stage('score.aggregate'):
+            index = SerialRiskIndex(probabilities, context_cols, score=serial_score)
+            df_ranking = index.to_frame(threshold, top=top)
+        if output_path:
+            with instrumentation.stage('score.write'):
+                _write_ranking(df_ranking, output_path)
+        return df_ranking
+
+    if threshold is None:
+        rows = None
+        probabilities = predictor.predict(X)
+    else:
+        # Com limiar, a pontuação é consumida bloco a bloco e apenas os alertas de cada bloco são mantidos
+        rows, probabilities = [np.empty(0, dtype=np.int64)], [np.empty(0)]
+        with instrumentation.stage('predict'):
+            for start, block in predictor.iter_predict(X):
+                hits = np.flatnonzero(block >= threshold)
+                rows.append(hits + start)
+                probabilities.append(block[hits])
+        rows = np.concatenate(rows)
+        probabilities = np.concatenate(probabilities)
+        context_cols = context_cols[rows]
+
+    with instrumentation.stage('score.rank'):
+        df_ranking = RiskRanking(probabilities, context_cols).to_frame(threshold)
+        if rows is not None:
+            # Índice = linha original do CSV pontuado, como no caminho sem limiar
+            df_ranking.index = rows[df_ranking.index]
+
+    if output_path:
+        with instrumentation.stage('score.write'):
+            _write_ranking(df_ranking, output_path)
+
+    return df_ranking
+
+
+def _write_ranking(df_ranking, output_path):
+    # Mesmo formato de Ranking_Risco_PSO.csv (probabilidade com 4 casas)
+    df_out = df_ranking.copy()
+    for col in ['Probabilidade_Risco'] + [c for c in SerialRiskIndex.COLUNAS if c.startswith('Risco_')]:
+        if col in df_out.columns:
+            df_out[col] = df_out[col].map(lambda x: f'{x:.4f}')
+    df_out.to_csv(output_path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pontua um CSV de envios com um modelo salvo (sem PSO).")
+    parser.add_argument('artifact', help="Diretório do artefato salvo por FailurePredictor.save().")
+    parser.add_argument('csv', help="CSV de envios a pontuar.")
+    parser.add_argument('-o', '--output', default='Ranking_Risco_PSO.csv')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ranking = score_csv(args.artifact, args.csv, args.output)
+    print(f"{len(ranking)} envios pontuados em {time.perf_counter() - start:.3f}s -> {args.output}")
@@ -0,0 +1,127 @@
+import cProfile
+import contextlib
+import json
+import os
+import threading
+import time
+
+
+class Instrumentation:
+    # Timers e contadores leves por etapa do pipeline (leitura do CSV, rotulagem, features, iterações do PSO,
+    # avaliações de fitness, SMOTE, treino final e previsão). Cada etapa acumula chamadas, tempo total e máximo.
+    # log_path: grava cada etapa concluída como uma linha JSON (JSON Lines) para análise posterior.
+    # profile_path: executa os blocos profiled() sob o cProfile e grava as estatísticas (.prof, para pstats/snakeviz).
+    # O cProfile fica desligado por padrão: assim o py-spy (amostragem externa) mede o código sem distorção.
+
+    ENV_LOG = 'PIPELINE_LOG'
+    ENV_PROFILE = 'PIPELINE_PROFILE'
+
+    def __init__(self, log_path=None, profile_path=None):
+        self.log_path = log_path
+        self.profile_path = profile_path
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.RLock()
+        self._log_file = None
+        self._profiler = None
+
+    def __getstate__(self):
+        # Cópia enviada a outro processo: mesmos caminhos, sem o lock, o arquivo aberto e o cProfile
+        state = self.__dict__.copy()
+        state.update(_lock=None, _log_file=None, _profiler=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_env(cls):
+        # Liga o log estruturado e o cProfile pelas variáveis de ambiente (útil na GUI, que não tem flags)
+        return cls(log_path=os.environ.get(cls.ENV_LOG), profile_path=os.environ.get(cls.ENV_PROFILE))
+
+    @contextlib.contextmanager
+    def stage(self, name, **fields):
+        # Cronometra o bloco; fields extras (ex.: iteration=3) vão apenas para o log estruturado
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, **fields)
+
+    def record(self, name, seconds, **fields):
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = {'calls': 0, 'seconds': 0.0, 'max': 0.0}
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+            if self.log_path:
+                self._write({'event': 'stage', 'stage': name, 'seconds': round(seconds, 6), **fields})
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def _write(self, record):
+        if self._log_file is None:
+            directory = os.path.dirname(self.log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._log_file = open(self.log_path, 'a', encoding='utf-8', buffering=1)
+        record = {'time': round(time.time(), 6), 'pid': os.getpid(), 'thread': threading.current_thread().name,
+                  **record}
+        self._log_file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    @contextlib.contextmanager
+    def profiled(self):
+        # Roda o bloco sob o cProfile quando profile_path foi definido (as chamadas se acumulam no mesmo .prof)
+        if not self.profile_path:
+            yield
+            return
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        try:
+            yield
+        finally:
+            self._profiler.disable()
+            directory = os.path.dirname(self.profile_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._profiler.dump_stats(self.profile_path)
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+
+    def summary(self):
+        # Etapas ordenadas pelo tempo total (as etapas são aninhadas: 'train.pso' inclui os 'fitness.*')
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1]['seconds'], reverse=True)
+            return {
+                'stages': {
+                    name: {'calls': s['calls'], 'seconds': round(s['seconds'], 6), 'max': round(s['max'], 6)}
+                    for name, s in stages
+                },
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def format_summary(self, top=None):
+        # Resumo em texto (GUI e linha de comando)
+        summary = self.summary()
+        stages = list(summary['stages'].items())[:top]
+        lines = [f"{name:<24} {s['seconds']:>9.3f}s  {s['calls']:>6}x" for name, s in stages]
+        lines += [f"{name:<24} {value:>10}" for name, value in summary['counters'].items()]
+        return "\n".join(lines)
+
+    def close(self):
+        # Grava o resumo final no log estruturado e fecha o arquivo
+        if self.log_path:
+            with self._lock:
+                self._write({'event': 'summary', **self.summary()})
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
@@ -0,0 +1,56 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_text(text):
+    # Remove acentos e normaliza maiúsculas/minúsculas ('Substituição' -> 'substituicao').
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+class KeywordLabeler:
+    # Etapa de rotulagem da variável alvo 'Falha' por palavras-chave no Motivo.
+    # As palavras-chave são normalizadas e compiladas em uma única expressão regular; o casamento é feito
+    # apenas sobre os textos ÚNICOS de Motivo (dicionário categórico) e mapeado de volta pelos códigos.
+    # As contagens por palavra-chave usam um padrão próprio de cada uma, então palavras sobrepostas
+    # ('troca' dentro de 'trocar') são contadas ambas.
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self._normalized = [normalize_text(k) for k in self.keywords]
+        unique_keywords = list(dict.fromkeys(self._normalized))
+        self.pattern = re.compile('|'.join(re.escape(k) for k in unique_keywords))
+        self._patterns = {k: re.compile(re.escape(k)) for k in unique_keywords}
+        self.hit_counts = {}
+
+    def label(self, motivos):
+        # Retorna um array 0/1 (1 = Falha) alinhado a 'motivos' e atualiza self.hit_counts
+        # (número de linhas em que cada palavra-chave aparece).
+        if isinstance(motivos.dtype, pd.CategoricalDtype):
+            codes = motivos.cat.codes.to_numpy()
+            uniques = motivos.cat.categories
+        else:
+            codes, uniques = pd.factorize(motivos)
+
+        texts = [normalize_text(text) for text in uniques]
+        # Padrão único para o rótulo; os individuais só nos textos que casaram com algum
+        matches = [
+            [k for k, pattern in self._patterns.items() if pattern.search(text)] if self.pattern.search(text) else []
+            for text in texts
+        ]
+        unique_labels = np.array([bool(found) for found in matches] + [False], dtype=int)
+
+        # Código -1 (Motivo ausente) aponta para o último elemento: nunca é Falha
+        labels = unique_labels[codes]
+
+        rows_per_unique = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        hits = dict.fromkeys(self._normalized, 0)
+        for found, n_rows in zip(matches, rows_per_unique):
+            for keyword in found:
+                hits[keyword] += int(n_rows)
+        self.hit_counts = {k: hits[normalize_text(k)] for k in self.keywords}
+
+        return labels
@@ -1,17 +1,107 @@
 import random
+import os
+import json
+import shutil
+import tempfile
+import time
+import joblib
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import cross_val_score, train_test_split
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 from imblearn.over_sampling import SMOTE
 
+from joblib import Parallel, delayed
+
+from src.fitness import (
+    DEFAULT_FIDELITY_RUNGS, EXTENDED_BOUNDS, MULTI_FIDELITY_MIN_ROWS, FitnessCache, FitnessEvaluator,
+    MultiObjectiveEvaluator, dataset_fingerprint
+)
+from src.instrumentation import Instrumentation
+from src.parallel import plan_parallelism
+from src.ranking import DEFAULT_THRESHOLD
+from src.scoring import DEFAULT_CHUNK_ROWS, BatchScorer
+
 SEED = 42
+# Versão do formato do artefato salvo (incrementar ao mudar o conteúdo de meta.json/model.joblib)
+ARTIFACT_VERSION = 3
 random.seed(SEED)
 np.random.seed(SEED)
 
+
+class OptimizationCancelled(Exception):
+    # Levantada quando o treinamento é cancelado (stop_event) antes do fim da otimização.
+    pass
+
+
+class PSOHistory:
+    # Histórico por iteração do PSO: melhor pontuação (gbest), diâmetro do enxame (no espaço normalizado
+    # pelos limites), avaliações acumuladas, tempo decorrido e inércia usada; stop_reason diz por que parou.
+
+    def __init__(self):
+        self.iterations = []
+        self.best_scores = []
+        self.diameters = []
+        self.evaluations = []
+        self.elapsed = []
+        self.inertia = []
+        self.stop_reason = None
+
+    def __len__(self):
+        return len(self.iterations)
+
+    def append(self, iteration, best_score, diameter, evaluations, elapsed, inertia):
+        self.iterations.append(int(iteration))
+        self.best_scores.append(float(best_score))
+        self.diameters.append(None if diameter is None else float(diameter))
+        self.evaluations.append(int(evaluations))
+        self.elapsed.append(float(elapsed))
+        self.inertia.append(None if inertia is None else float(inertia))
+
+    def stagnated(self, patience, tol=1e-9):
+        # True se o gbest não melhorou (mais que tol) nas últimas 'patience' iterações
+        if patience is None or len(self.best_scores) <= patience:
+            return False
+        return self.best_scores[-1] >= self.best_scores[-1 - patience] - tol
+
+    def as_dict(self):
+        return {
+            'iterations': self.iterations,
+            'best_scores': self.best_scores,
+            'diameters': self.diameters,
+            'evaluations': self.evaluations,
+            'elapsed': self.elapsed,
+            'inertia': self.inertia,
+            'stop_reason': self.stop_reason,
+        }
+
+
 class PSO:
     #Otimizador por Enxame de Partículas para encontrar os melhores hiperparâmetros.
-    def __init__(self, func, dim, bounds, num_particles=10, max_iter=10, w=0.7, c1=1.5, c2=1.5):
+    # mode='batch': atualização vetorizada do enxame inteiro e avaliação paralela (n_workers) das partículas.
+    # mode='async': laço original partícula a partícula (mantido para comparação).
+    # callback recebe um dicionário de progresso a cada iteração; stop_event (threading.Event) interrompe o enxame.
+    # instrumentation registra o tempo de cada iteração ('pso.iteration').
+    # PARADA POR CONVERGÊNCIA (modo 'batch'; None desliga cada critério): patience iterações sem melhora do gbest,
+    # diâmetro do enxame (normalizado pelos limites) abaixo de min_diameter, desvio-padrão das pontuações da
+    # iteração abaixo de min_score_std, orçamento de tempo (time_budget, s) ou de avaliações (max_evaluations).
+    # CONTROLE ADAPTATIVO: com w_min, a inércia cai linearmente de w até w_min ao longo de max_iter;
+    # v_max limita cada componente da velocidade a v_max * (limite superior - inferior).
+    # O modo 'async' reproduz o laço original (w constante, max_iter iterações) e recusa essas opções.
+    def __init__(self, func, dim, bounds, num_particles=10, max_iter=10, w=0.7, c1=1.5, c2=1.5,
+                 mode='batch', n_workers=1, backend='loky', seed=SEED, callback=None, stop_event=None,
+                 instrumentation=None, w_min=None, v_max=None, patience=None, min_diameter=None,
+                 min_score_std=None, time_budget=None, max_evaluations=None):
+        if mode not in ('batch', 'async'):
+            raise ValueError(f"Modo de PSO inválido: {mode!r} (use 'batch' ou 'async').")
+        if mode == 'async':
+            adaptive = {'w_min': w_min, 'v_max': v_max, 'patience': patience, 'min_diameter': min_diameter,
+                        'min_score_std': min_score_std, 'time_budget': time_budget,
+                        'max_evaluations': max_evaluations}
+            given = [name for name, value in adaptive.items() if value is not None]
+            if given:
+                raise ValueError(f"O modo 'async' (laço original) não aceita {', '.join(given)}: "
+                                 "use o modo 'batch' para inércia decrescente, limite de velocidade e parada antecipada.")
         self.func = func
         self.dim = dim
         self.bounds = bounds
@@ -20,8 +110,173 @@ class PSO:
         self.w = w
         self.c1 = c1
         self.c2 = c2
+        self.mode = mode
+        self.n_workers = n_workers
+        self.backend = backend
+        self.seed = seed
+        self.callback = callback
+        self.stop_event = stop_event
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self.w_min = w_min
+        self.v_max = v_max
+        self.patience = patience
+        self.min_diameter = min_diameter
+        self.min_score_std = min_score_std
+        self.time_budget = time_budget
+        self.max_evaluations = max_evaluations
+        self.history = PSOHistory()
+        self.evaluations = 0
+        self._start = None
+        self._last_report = None
+
+    def _check_stop(self):
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise OptimizationCancelled("Otimização por PSO cancelada.")
+
+    def inertia(self, iteration):
+        # Inércia da iteração (1..max_iter): constante ou decrescente linearmente até w_min
+        if self.w_min is None or self.max_iter <= 1:
+            return self.w
+        return self.w - (self.w - self.w_min) * (iteration - 1) / (self.max_iter - 1)
+
+    def diameter(self, particles):
+        # Maior distância entre duas partículas, com cada dimensão normalizada para [0, 1]
+        span = np.asarray(self.bounds[1], dtype=float) - np.asarray(self.bounds[0], dtype=float)
+        normalized = particles / np.where(span > 0, span, 1.0)
+        diffs = normalized[:, np.newaxis, :] - normalized[np.newaxis, :, :]
+        return float(np.sqrt((diffs ** 2).sum(axis=-1)).max())
+
+    def _stop_reason(self, particles=None, scores=None):
+        # Critério de convergência/orçamento atingido após a última iteração (ou None para continuar)
+        if self.history.stagnated(self.patience):
+            return 'stagnation'
+        if self.min_diameter is not None and particles is not None and self.diameter(particles) < self.min_diameter:
+            return 'diameter'
+        # Partículas descartadas cedo pela multi-fidelidade têm custo +inf e ficam fora do desvio-padrão
+        finite = None if scores is None else np.asarray(scores)[np.isfinite(scores)]
+        if self.min_score_std is not None and finite is not None and len(finite) and np.std(finite) < self.min_score_std:
+            return 'score_variance'
+        if self.time_budget is not None and time.perf_counter() - self._start >= self.time_budget:
+            return 'time_budget'
+        if self.max_evaluations is not None and self.evaluations >= self.max_evaluations:
+            return 'evaluation_budget'
+        return None
+
+    def _report(self, iteration, pbest_scores, particles=None, inertia=None):
+        # Evento de progresso: iteração 0 é a avaliação inicial do enxame (max_iter + 1 etapas no total)
+        now = time.perf_counter()
+        self.instrumentation.record('pso.iteration', now - self._last_report,
+                                   iteration=iteration, best_score=float(np.min(pbest_scores)))
+        self._last_report = now
+        self.history.append(
+            iteration, np.min(pbest_scores), None if particles is None else self.diameter(particles),
+            self.evaluations, now - self._start, inertia
+        )
+        if self.callback is None:
+            return
+        elapsed = now - self._start
+        self.callback({
+            'stage': 'pso',
+            'iteration': iteration,
+            'max_iter': self.max_iter,
+            'best_score': float(np.min(pbest_scores)),
+            'evaluations': self.evaluations,
+            'elapsed': elapsed,
+            'eta': elapsed / (iteration + 1) * (self.max_iter - iteration),
+        })
+
+    def _evaluate_batch(self, positions, incumbents=None):
+        # Usa a avaliação em lote da função de custo (com deduplicação) quando disponível.
+        # incumbents (pbest_scores) permite à função de custo descartar cedo partículas sem chance de melhora.
+        if hasattr(self.func, 'evaluate_batch'):
+            return self.func.evaluate_batch(positions, n_workers=self.n_workers, backend=self.backend,
+                                            incumbents=incumbents)
+        if self.n_workers == 1:
+            return np.array([self.func(p) for p in positions])
+        return np.array(Parallel(n_jobs=self.n_workers, backend=self.backend)(
+            delayed(self.func)(p) for p in positions
+        ))
 
     def optimize(self):
+        self.evaluations = 0
+        self.history = PSOHistory()
+        self._start = time.perf_counter()
+        self._last_report = self._start
+        if self.mode == 'async':
+            return self._optimize_async()
+        return self._optimize_batch()
+
+    def init_swarm(self):
+        # Estado inicial do enxame (iteração 0): posições aleatórias, velocidades nulas e pbest avaliado.
+        # O estado (incluindo o gerador privado) é um dicionário simples, para poder ser retomado por step()
+        # em outro processo (ver IslandPSO).
+        rng = np.random.default_rng(self.seed)
+        low, high = self.bounds[0], self.bounds[1]
+        particles = rng.uniform(low, high, (self.num_particles, self.dim))
+        pbest_scores = self._evaluate_batch(particles)
+        self.evaluations += self.num_particles
+        return {
+            'rng': rng,
+            'iteration': 0,
+            'particles': particles,
+            'velocities': np.zeros((self.num_particles, self.dim)),
+            'pbest': particles.copy(),
+            'pbest_scores': pbest_scores,
+            'scores': pbest_scores.copy(),
+            'inertia': None,
+            'gbest': particles[np.argmin(pbest_scores)].copy(),
+        }
+
+    def step(self, state):
+        # Uma iteração síncrona do enxame inteiro com operações matriciais
+        rng = state['rng']
+        low, high = self.bounds[0], self.bounds[1]
+        particles, velocities = state['particles'], state['velocities']
+        pbest, pbest_scores, gbest = state['pbest'], state['pbest_scores'], state['gbest']
+
+        r1 = rng.random((self.num_particles, self.dim))
+        r2 = rng.random((self.num_particles, self.dim))
+        w = self.inertia(state['iteration'] + 1)
+        velocities = w * velocities + self.c1 * r1 * (pbest - particles) + self.c2 * r2 * (gbest - particles)
+        if self.v_max is not None:
+            limit = self.v_max * (np.asarray(high, dtype=float) - np.asarray(low, dtype=float))
+            velocities = np.clip(velocities, -limit, limit)
+        particles = np.clip(particles + velocities, low, high)
+
+        scores = self._evaluate_batch(particles, incumbents=pbest_scores)
+        self.evaluations += self.num_particles
+        improved = scores < pbest_scores
+        pbest[improved] = particles[improved]
+        pbest_scores[improved] = scores[improved]
+
+        state['particles'] = particles
+        state['velocities'] = velocities
+        state['scores'] = scores
+        state['inertia'] = w
+        state['gbest'] = pbest[np.argmin(pbest_scores)].copy()
+        state['iteration'] += 1
+        return state
+
+    def _optimize_batch(self):
+        # Gerador privado: não depende (nem altera) o estado global de random/np.random.
+        # Para antes de max_iter quando um critério de convergência ou orçamento é atingido (ver _stop_reason).
+        self._check_stop()
+        state = self.init_swarm()
+        self._report(0, state['pbest_scores'], state['particles'])
+        self.history.stop_reason = self._stop_reason(state['particles'], state['scores'])
+
+        iteration = 0
+        while self.history.stop_reason is None and iteration < self.max_iter:
+            self._check_stop()
+            self.step(state)
+            iteration = state['iteration']
+            self._report(iteration, state['pbest_scores'], state['particles'], state['inertia'])
+            self.history.stop_reason = self._stop_reason(state['particles'], state['scores'])
+        if self.history.stop_reason is None:
+            self.history.stop_reason = 'max_iter'
+        return state['gbest']
+
+    def _optimize_async(self):
         # FIXADO: Garante que as posições e velocidades iniciais sejam sempre as mesmas
         np.random.seed(42) 
         
@@ -29,63 +284,486 @@ class PSO:
         velocities = np.zeros((self.num_particles, self.dim))
         pbest = particles.copy()
         pbest_scores = np.array([self.func(p) for p in particles])
+        self.evaluations += self.num_particles
         gbest = pbest[np.argmin(pbest_scores)].copy()
+        self._report(0, pbest_scores, particles)
 
-        for _ in range(self.max_iter):
+        for iteration in range(1, self.max_iter + 1):
             for i in range(self.num_particles):
+                self._check_stop()
                 r1, r2 = random.random(), random.random()
                 velocities[i] = (self.w * velocities[i] + self.c1 * r1 * (pbest[i] - particles[i]) + self.c2 * r2 * (gbest - particles[i]))
                 particles[i] += velocities[i]
                 particles[i] = np.clip(particles[i], self.bounds[0], self.bounds[1])
                 score = self.func(particles[i])
+                self.evaluations += 1
                 if score < pbest_scores[i]:
                     pbest[i] = particles[i].copy()
                     pbest_scores[i] = score
             gbest = pbest[np.argmin(pbest_scores)].copy()
+            self._report(iteration, pbest_scores, particles, self.w)
+        self.history.stop_reason = 'max_iter'
         return gbest
 
+# Configurações (w, c1, c2) das ilhas, usadas em ciclo: a ilha 0 repete o enxame único padrão;
+# as demais variam entre exploração (w alto / c1 alto) e convergência rápida (c2 alto)
+ISLAND_PRESETS = [(0.7, 1.5, 1.5), (0.9, 1.0, 2.0), (0.5, 2.0, 1.0), (0.8, 1.2, 1.2)]
+
+
+def _evaluator_counters(func):
+    # Contadores da função de custo (FitnessEvaluator) que precisam voltar do processo da ilha
+    if not hasattr(func, 'cache'):
+        return {}
+    counters = {'hits': func.cache.hits, 'misses': func.cache.misses,
+                'promotions': func.promotions, 'early_stops': func.early_stops}
+    if func.forest_pool is not None:
+        counters['trees_fitted'] = func.forest_pool.trees_fitted
+        counters['trees_reused'] = func.forest_pool.trees_reused
+    return counters
+
+
+def _trace_point(state, evaluations):
+    return {
+        'iteration': state['iteration'],
+        'best_score': float(np.min(state['pbest_scores'])),
+        'evaluations': evaluations,
+        'gbest': state['gbest'].tolist(),
+    }
+
+
+# Funções de custo residentes nos processos das ilhas, indexadas pelo arquivo gravado por IslandPSO.
+# Os workers do loky persistem entre as épocas: o avaliador (X, y e folds em memmap somente leitura)
+# é carregado uma única vez por processo, e cada época só envia o estado do enxame e o cache compartilhado.
+_RESIDENT_FUNCS = {}
+
+
+def _resident_func(path):
+    func = _RESIDENT_FUNCS.get(path)
+    if func is None:
+        # Um treinamento novo substitui o avaliador do anterior (não acumula dados antigos no worker)
+        _RESIDENT_FUNCS.clear()
+        func = _RESIDENT_FUNCS[path] = joblib.load(path, mmap_mode='r')
+    return func
+
+
+def _known_keys(func):
+    # Chaves já conhecidas pela função de custo (cache completo, cache dos degraus e avaliações estendidas)
+    return (
+        set(func.cache._entries) if hasattr(func, 'cache') else set(),
+        set(func._rung_cache._entries) if hasattr(func, '_rung_cache') else set(),
+        set(getattr(func, 'trials', {})),
+    )
+
+
+def _absorb_shared(func, shared):
+    # Entradas avaliadas por outras ilhas (mescladas no processo principal) chegam ao avaliador residente
+    if not shared or not hasattr(func, 'cache'):
+        return
+    for cache, entries in ((func.cache, shared['cache']), (func._rung_cache, shared['rung_cache'])):
+        for key, score in entries:
+            if key not in cache:
+                cache.put(key, score)
+
+
+def _island_epoch(pso, state, n_iter, func_path=None, shared=None):
+    # Executado no processo da ilha: inicializa o enxame (state=None) e/ou avança n_iter iterações.
+    # Com func_path, a função de custo é a residente do processo (ver _resident_func), atualizada com shared.
+    # Retorna o novo estado, o traço de convergência do trecho, as avaliações feitas e o que a função
+    # de custo aprendeu nesta época (entradas novas dos caches, avaliações e contadores), para ser
+    # mesclado no processo principal.
+    if func_path is not None:
+        pso.func = _resident_func(func_path)
+        _absorb_shared(pso.func, shared)
+    before = _evaluator_counters(pso.func)
+    known_cache, known_rungs, known_trials = _known_keys(pso.func)
+    start_evaluations = pso.evaluations
+    trace = []
+    if state is None:
+        state = pso.init_swarm()
+        trace.append(_trace_point(state, pso.evaluations))
+    for _ in range(n_iter):
+        pso.step(state)
+        trace.append(_trace_point(state, pso.evaluations))
+
+    after = _evaluator_counters(pso.func)
+    func = pso.func
+    learned = {
+        'evaluations': pso.evaluations - start_evaluations,
+        'counters': {name: after[name] - before[name] for name in after},
+        'cache': [item for item in func.cache._entries.items() if item[0] not in known_cache]
+        if hasattr(func, 'cache') else [],
+        # Custos de baixa fidelidade (successive halving), mesclados como o cache completo
+        'rung_cache': [item for item in func._rung_cache._entries.items() if item[0] not in known_rungs]
+        if hasattr(func, '_rung_cache') else [],
+        # Avaliações completas do espaço estendido (limiares e métricas para a fronteira de Pareto)
+        'trials': [item for item in getattr(func, 'trials', {}).items() if item[0] not in known_trials],
+    }
+    if func_path is not None:
+        pso.func = None
+    return state, trace, learned
+
+
+class IslandPSO(PSO):
+    # Modelo de ilhas: n_islands sub-enxames independentes (sementes e w/c1/c2 diferentes), cada um em um
+    # processo, trocam periodicamente suas melhores partículas (topologia em anel). A cada
+    # migration_interval iterações, os n_migrants melhores pbest da ilha i substituem os piores da ilha i+1.
+    # O cache de fitness (e o dos degraus de fidelidade) é mesclado entre épocas, então uma ilha não reavalia
+    # o que outra já avaliou. Com processos, a função de custo é gravada uma vez (arrays em memmap) e fica
+    # residente nos workers; cada época envia apenas o estado do enxame e as entradas do cache.
+    # Ao final, self.islands traz o resultado e o traço de convergência de cada ilha.
+    # patience (em épocas)/time_budget/max_evaluations são verificados entre épocas, sobre o melhor global;
+    # v_max vale para todas as ilhas.
+
+    def __init__(self, func, dim, bounds, n_islands=4, num_particles=8, max_iter=10, migration_interval=2,
+                 n_migrants=1, island_params=None, n_workers=1, backend='loky', seed=SEED, callback=None,
+                 stop_event=None, instrumentation=None, v_max=None, patience=None, time_budget=None,
+                 max_evaluations=None):
+        super().__init__(func, dim, bounds, num_particles=num_particles, max_iter=max_iter, mode='batch',
+                         n_workers=n_workers, backend=backend, seed=seed, callback=callback,
+                         stop_event=stop_event, instrumentation=instrumentation, v_max=v_max,
+                         patience=patience, time_budget=time_budget, max_evaluations=max_evaluations)
+        self.n_islands = max(1, int(n_islands))
+        self.migration_interval = max(1, int(migration_interval))
+        self.n_migrants = max(0, min(int(n_migrants), num_particles - 1))
+        if island_params is None:
+            island_params = [ISLAND_PRESETS[i % len(ISLAND_PRESETS)] for i in range(self.n_islands)]
+        self.island_params = [tuple(p) for p in island_params]
+        self.islands = []
+
+    def _island_swarms(self, func):
+        # Um PSO sequencial por ilha (o paralelismo está entre as ilhas); func=None nos enxames enviados
+        # a outros processos, que usam a função de custo residente
+        return [
+            PSO(func, self.dim, self.bounds, num_particles=self.num_particles, max_iter=self.max_iter,
+                w=w, c1=c1, c2=c2, mode='batch', n_workers=1, seed=self.seed + i,
+                instrumentation=self.instrumentation, v_max=self.v_max)
+            for i, (w, c1, c2) in enumerate(self.island_params)
+        ]
+
+    def _migrate(self, states):
+        # Anel: os melhores pbest de cada ilha substituem os piores da próxima (se forem melhores)
+        if self.n_migrants == 0 or len(states) < 2:
+            return
+        migrants = []
+        for state in states:
+            best = np.argsort(state['pbest_scores'], kind='stable')[:self.n_migrants]
+            migrants.append((state['pbest'][best].copy(), state['pbest_scores'][best].copy()))
+        for i, (positions, scores) in enumerate(migrants):
+            target = states[(i + 1) % len(states)]
+            worst = np.argsort(target['pbest_scores'], kind='stable')[::-1][:self.n_migrants]
+            for j, position, score in zip(worst, positions, scores):
+                if score < target['pbest_scores'][j]:
+                    target['pbest'][j] = position
+                    target['pbest_scores'][j] = score
+                    target['particles'][j] = position
+                    target['velocities'][j] = 0.0
+            target['gbest'] = target['pbest'][np.argmin(target['pbest_scores'])].copy()
+
+    def _merge(self, learned):
+        # Incorpora no processo principal o que cada ilha avaliou no seu processo
+        self.evaluations += learned['evaluations']
+        func = self.func
+        if not hasattr(func, 'cache'):
+            return
+        for key, score in learned['cache']:
+            if key not in func.cache:
+                func.cache.put(key, score)
+        if hasattr(func, '_rung_cache'):
+            for key, score in learned.get('rung_cache', []):
+                if key not in func._rung_cache:
+                    func._rung_cache.put(key, score)
+        if hasattr(func, 'trials'):
+            for key, trial in learned.get('trials', []):
+                func.trials.setdefault(key, trial)
+        counters = learned['counters']
+        func.cache.hits += counters.get('hits', 0)
+        func.cache.misses += counters.get('misses', 0)
+        func.promotions += counters.get('promotions', 0)
+        func.early_stops += counters.get('early_stops', 0)
+        if func.forest_pool is not None:
+            func.forest_pool.trees_fitted += counters.get('trees_fitted', 0)
+            func.forest_pool.trees_reused += counters.get('trees_reused', 0)
+
+    def _share_func(self):
+        # Grava a função de custo uma única vez (folds já materializados) para ser mapeada pelos workers
+        if hasattr(self.func, 'materialize_folds'):
+            self.func.materialize_folds()
+        directory = tempfile.mkdtemp(prefix='pso_islands_')
+        path = os.path.join(directory, 'func.joblib')
+        joblib.dump(self.func, path)
+        return path
+
+    def _shared(self):
+        # Cache do processo principal (já com o que todas as ilhas avaliaram) para os avaliadores residentes
+        func = self.func
+        if not hasattr(func, 'cache'):
+            return None
+        return {
+            'cache': list(func.cache._entries.items()),
+            'rung_cache': list(func._rung_cache._entries.items()) if hasattr(func, '_rung_cache') else [],
+        }
+
+    def optimize(self):
+        self.evaluations = 0
+        self.history = PSOHistory()
+        self._start = time.perf_counter()
+        self._last_report = self._start
+        # Com um único worker as ilhas rodam neste processo e já compartilham a função de custo
+        in_process = self.n_workers == 1
+        func_path = None if in_process else self._share_func()
+        swarms = self._island_swarms(self.func if in_process else None)
+        states = [None] * self.n_islands
+        traces = [[] for _ in range(self.n_islands)]
+
+        done = 0
+        try:
+            with Parallel(n_jobs=self.n_workers, backend=self.backend) as parallel:
+                while (done < self.max_iter or states[0] is None) and self.history.stop_reason is None:
+                    self._check_stop()
+                    n_iter = min(self.migration_interval, self.max_iter - done)
+                    if in_process:
+                        results = []
+                        for swarm, state in zip(swarms, states):
+                            evaluations = swarm.evaluations
+                            results.append(_island_epoch(swarm, state, n_iter))
+                            self.evaluations += swarm.evaluations - evaluations
+                    else:
+                        shared = self._shared()
+                        results = parallel(
+                            delayed(_island_epoch)(swarm, state, n_iter, func_path, shared)
+                            for swarm, state in zip(swarms, states)
+                        )
+                    for i, (state, trace, learned) in enumerate(results):
+                        states[i] = state
+                        traces[i].extend(trace)
+                        if not in_process:
+                            self._merge(learned)
+                    done += n_iter
+                    if done < self.max_iter:
+                        self._migrate(states)
+                    # Um evento de progresso (e um registro 'pso.iteration') por época de migração
+                    self._report(done, np.concatenate([s['pbest_scores'] for s in states]))
+                    self.history.stop_reason = self._stop_reason()
+        finally:
+            if func_path is not None:
+                shutil.rmtree(os.path.dirname(func_path), ignore_errors=True)
+        if self.history.stop_reason is None:
+            self.history.stop_reason = 'max_iter'
+
+        self.islands = [
+            {
+                'island': i,
+                'seed': self.seed + i,
+                'w': w, 'c1': c1, 'c2': c2,
+                'best_score': float(np.min(state['pbest_scores'])),
+                'best_position': state['gbest'].tolist(),
+                'trace': trace,
+            }
+            for i, ((w, c1, c2), state, trace) in enumerate(zip(self.island_params, states, traces))
+        ]
+        best = min(range(self.n_islands), key=lambda i: self.islands[i]['best_score'])
+        return states[best]['gbest']
+
+
 # CLASSE FailurePredictor (COM REGULARIZAÇÃO)
 class FailurePredictor:
     #Treina um modelo Random Forest com otimização de hiperparâmetros (PSO) e balanceamento (SMOTE).
-    def __init__(self):
-        self.model = RandomForestClassifier(random_state=42)
+    def __init__(self, cache_dir=None, cache_size=256, pso_mode='batch', n_cores=None, parallel_split=None,
+                 multi_fidelity='auto', warm_start=True, instrumentation=None,
+                 predict_chunk_rows=DEFAULT_CHUNK_ROWS, n_islands=4,
+                 pso_patience=None, pso_time_budget=None, pso_max_evaluations=None, smote_folds=False,
+                 search_space='basic', max_alert_rate=None, alert_cost_ratio=None):
+        if search_space not in ('basic', 'extended'):
+            raise ValueError(f"Espaço de busca inválido: {search_space!r} (use 'basic' ou 'extended').")
+        if max_alert_rate is not None and alert_cost_ratio is not None:
+            raise ValueError("Use apenas uma regra de limiar: max_alert_rate ou alert_cost_ratio.")
+        if (max_alert_rate is not None or alert_cost_ratio is not None) and (
+                search_space != 'extended' or not smote_folds):
+            # O limiar é escolhido sobre as probabilidades fora do fold: elas só valem para o modelo final
+            # (treinado com SMOTE) se os folds também forem reamostrados
+            raise ValueError("A escolha do limiar (max_alert_rate/alert_cost_ratio) requer search_space='extended' "
+                             "e smote_folds=True.")
+        if pso_mode == 'async' and any(v is not None for v in (pso_patience, pso_time_budget, pso_max_evaluations)):
+            raise ValueError("O modo de PSO 'async' (laço original) não tem parada antecipada: "
+                             "use 'batch' ou 'islands' com paciência ou orçamentos de tempo/avaliações.")
+        self._model = RandomForestClassifier(random_state=42)
         self.feature_importances_ = None
         self.best_params = {}
+        # 'basic': PSO em (n_estimators, max_depth) contra o Recall da validação cruzada.
+        # 'extended': também min_samples_leaf e max_features, com o limiar de decisão escolhido sobre as
+        # probabilidades fora do fold (ver MultiObjectiveEvaluator); best_params passa a incluir 'threshold'.
+        self.search_space = search_space
+        # Fronteira de Pareto (Recall x volume de alertas x custo de treino) do espaço estendido
+        self.pareto_front = None
+        # Regra explícita para escolher o limiar de alerta na fronteira (sem regra, vale DEFAULT_THRESHOLD):
+        # fração máxima de envios em alerta ou custo de uma falha não detectada em alertas falsos
+        self.max_alert_rate = max_alert_rate
+        self.alert_cost_ratio = alert_cost_ratio
+        # Cache de fitness do PSO (cache_dir=None mantém o cache apenas em memória)
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.fitness_cache = None
+        # 'batch' (padrão desde a versão vetorizada do PSO), 'async' (laço original partícula a partícula,
+        # para reproduzir resultados antigos) ou 'islands' (sub-enxames em processos separados, ver IslandPSO)
+        self.pso_mode = pso_mode
+        self.n_islands = n_islands
+        self.pso_islands = None
+        # Parada antecipada do PSO (opcional, None desliga): iterações sem melhora do gbest e orçamentos
+        # de tempo (s) e de avaliações. Não se aplica ao modo 'async'.
+        self.pso_patience = pso_patience
+        self.pso_time_budget = pso_time_budget
+        self.pso_max_evaluations = pso_max_evaluations
+        self.pso_history = None
+        # Orçamento de núcleos dividido entre partículas, folds e árvores (ver src/parallel.py)
+        self.n_cores = n_cores
+        self.parallel_split = parallel_split
+        self.parallel_plan = None
+        # Avaliação multi-fidelidade (successive halving): True, False ou 'auto' (conjuntos grandes)
+        self.multi_fidelity = multi_fidelity
+        # Reaproveita as florestas por (max_depth, fold) entre candidatos de n_estimators
+        self.warm_start = warm_start
+        # Aplica o SMOTE ao treino de cada fold da validação cruzada do PSO (mesmo balanceamento do treino final)
+        self.smote_folds = smote_folds
+        # Folds da validação cruzada do PSO em que o SMOTE falhou e o treino seguiu sem reamostragem
+        self.smote_skipped = 0
+        # Tempos e contadores do PSO, das avaliações de fitness, do SMOTE, do treino final e da previsão
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
 
-    def train(self, X, y):
-        
-        #FUNÇÃO DE CUSTO: Otimiza o Recall com Ponderação de Classe
-        def cost(params):
-            try:
-                n_estimators = max(1, int(params[0]))
-                depth = max(1, int(params[1]))
-                
-                model = RandomForestClassifier(
-                    n_estimators=n_estimators, 
-                    max_depth=depth, 
-                    random_state=42, 
-                    n_jobs=-1,
-                    # AUMENTO DE REGULARIZAÇÃO: Impede folhas com poucas amostras, suavizando a previsão
-                    min_samples_leaf=5,
-                    # Ponderação de classe no PSO
-                    class_weight='balanced' 
-                )
-                
-                # Validação Cruzada usando RECALL
-                scores = cross_val_score(model, X, y, cv=5, scoring='recall', n_jobs=-1, error_score='raise')
-                
-                # Retornamos 1 - Recall (para minimização)
-                return 1 - np.mean(scores)
-            except Exception as e:
-                return 99999.0
+        # Artefato salvo: pré-processamento ajustado e carregamento preguiçoso da floresta
+        self.metrics = None
+        self.preprocessing = None
+        self.feature_names = None
+        self.schema_hash = None
+        self._artifact_path = None
+        self._mmap_mode = None
+
+        # Pontuação em lote (ver src/scoring.py): blocos de linhas com memória limitada
+        self.predict_chunk_rows = predict_chunk_rows
+        self._scorer = None
+
+    @property
+    def model(self):
+        # Com um artefato carregado, a floresta só é lida do disco na primeira previsão
+        if self._model is None and self._artifact_path is not None:
+            with self.instrumentation.stage('model.load'):
+                self._model = joblib.load(os.path.join(self._artifact_path, 'model.joblib'), mmap_mode=self._mmap_mode)
+        return self._model
+
+    @model.setter
+    def model(self, value):
+        self._model = value
+        self._scorer = None
+
+    @property
+    def threshold(self):
+        # Limiar de alerta: o escolhido na fronteira de Pareto (regra explícita) ou o padrão do Ranking de Risco
+        return self.best_params.get('threshold', DEFAULT_THRESHOLD)
+
+    @property
+    def objective(self):
+        # Métrica otimizada pelo PSO (o custo é 1 - objetivo): F2 fora do fold no espaço estendido, Recall no básico
+        return 'F2 (OOF)' if self.search_space == 'extended' else 'Recall (CV)'
+
+    def scorer(self):
+        # Pontuador em lote da floresta atual (recriado quando o modelo ou as opções mudam)
+        scorer = self._scorer
+        if scorer is None or scorer.chunk_rows != self.predict_chunk_rows:
+            n_jobs = self.parallel_plan.n_cores if self.parallel_plan is not None else self.n_cores
+            self._scorer = scorer = BatchScorer(self.model, chunk_rows=self.predict_chunk_rows, n_jobs=n_jobs)
+        return scorer
+
+    def train(self, X, y, progress=None, stop_event=None):
+        # progress: callback com eventos de progresso (PSO e etapas finais); stop_event: cancela o treinamento.
+
+        # CACHE DE FITNESS: partículas que colapsam no mesmo par inteiro não refazem a validação cruzada
+        extended = self.search_space == 'extended'
+        fingerprint = dataset_fingerprint(X, y, extra={
+            'cv': 5, 'scoring': 'f2_oof' if extended else 'recall', 'min_samples_leaf': 5,
+            'smote_folds': bool(self.smote_folds), 'search_space': self.search_space,
+        })
+        self.fitness_cache = FitnessCache(max_size=self.cache_size, cache_dir=self.cache_dir, fingerprint=fingerprint)
+        cache = self.fitness_cache
+
+        # 1. DIVISÃO DOS NÚCLEOS: um único orçamento para enxame, folds e árvores (sem paralelismo aninhado)
+        num_particles = 8
+        # No modo de ilhas o nível externo de paralelismo são as ilhas (uma por processo)
+        outer = {'batch': num_particles, 'islands': self.n_islands}.get(self.pso_mode, 1)
+        plan = plan_parallelism(
+            self.n_cores,
+            n_particles=outer,
+            n_folds=5,
+            split=self.parallel_split
+        )
+        self.parallel_plan = plan
+        print(f"Divisão de núcleos: {plan.n_cores} núcleos -> {plan.swarm} partículas x {plan.folds} folds x {plan.trees} árvores")
+
+        #FUNÇÃO DE CUSTO: Otimiza o Recall com Ponderação de Classe (ver src/fitness.py)
+        use_fidelity = self.multi_fidelity
+        if use_fidelity == 'auto':
+            use_fidelity = len(y) >= MULTI_FIDELITY_MIN_ROWS
+        if extended:
+            # Espaço estendido: F-beta sobre as probabilidades fora do fold, limiar por varredura
+            use_fidelity = False
+            cost = MultiObjectiveEvaluator(
+                X, y, cache, fold_jobs=plan.folds, tree_jobs=plan.trees,
+                instrumentation=self.instrumentation, smote_folds=self.smote_folds
+            )
+        else:
+            cost = FitnessEvaluator(
+                X, y, cache, fold_jobs=plan.folds, tree_jobs=plan.trees,
+                fidelity_rungs=DEFAULT_FIDELITY_RUNGS if use_fidelity else None,
+                warm_start=self.warm_start, instrumentation=self.instrumentation, smote_folds=self.smote_folds
+            )
 
         # 2. EXECUÇÃO DO PSO
-        bounds = [(1.0, 100.0), (10.0, 50.0)] 
+        bounds = EXTENDED_BOUNDS if extended else [(1.0, 100.0), (10.0, 50.0)]
         pso_bounds = [np.array([b[0] for b in bounds]), np.array([b[1] for b in bounds])]
 
         print("Iniciando Otimização por PSO...")
-        pso = PSO(func=cost, dim=2, bounds=pso_bounds, max_iter=5, num_particles=8)
-        best_params = pso.optimize()
+        # Convergência: para quando o enxame colapsa (diâmetro < 2% dos limites) e, se pedido, quando o gbest
+        # estagna ou um orçamento acaba; inércia decrescente 0.9 -> 0.4 e velocidade limitada a 20% do
+        # intervalo de cada dimensão. O modo 'async' mantém o laço original (w=0.7, sempre max_iter iterações).
+        stopping = dict(v_max=0.2, patience=self.pso_patience, time_budget=self.pso_time_budget,
+                        max_evaluations=self.pso_max_evaluations)
+        if self.pso_mode == 'islands':
+            pso = IslandPSO(func=cost, dim=len(bounds), bounds=pso_bounds, n_islands=self.n_islands, max_iter=5,
+                            num_particles=num_particles, n_workers=plan.swarm, callback=progress,
+                            stop_event=stop_event, instrumentation=self.instrumentation, **stopping)
+        elif self.pso_mode == 'async':
+            pso = PSO(func=cost, dim=len(bounds), bounds=pso_bounds, max_iter=5, num_particles=num_particles,
+                      mode='async', n_workers=plan.swarm, callback=progress, stop_event=stop_event,
+                      instrumentation=self.instrumentation)
+        else:
+            pso = PSO(func=cost, dim=len(bounds), bounds=pso_bounds, max_iter=5, num_particles=num_particles,
+                      mode=self.pso_mode, n_workers=plan.swarm, callback=progress, stop_event=stop_event,
+                      instrumentation=self.instrumentation, w=0.9, w_min=0.4, min_diameter=0.02, **stopping)
+        with plan.limits(), self.instrumentation.stage('train.pso'):
+            best_params = pso.optimize()
+        self.instrumentation.count('pso.evaluations', pso.evaluations)
+        self.pso_history = pso.history.as_dict()
+        print(f"PSO encerrado na iteração {pso.history.iterations[-1]} ({pso.history.stop_reason}), "
+              f"{pso.evaluations} avaliações")
+
+        if self.pso_mode == 'islands':
+            self.pso_islands = pso.islands
+            for island in pso.islands:
+                n_est, depth = (int(v) for v in island['best_position'][:2])
+                print(f"Ilha {island['island']} (w={island['w']}, c1={island['c1']}, c2={island['c2']}): "
+                      f"{self.objective} {1 - island['best_score']:.4f} em n_estimators={n_est}, max_depth={depth}")
+
+        stats = cache.stats()
+        print(f"Cache de Fitness: {stats['hits']} acertos, {stats['misses']} avaliações ({stats['hit_rate']:.0%} reaproveitado)")
+        if use_fidelity:
+            print(f"Multi-fidelidade: {cost.early_stops} partículas descartadas cedo, {cost.promotions} promoções")
+        if cost.forest_pool is not None:
+            print(f"Florestas incrementais: {cost.forest_pool.trees_fitted} árvores treinadas, "
+                  f"{cost.forest_pool.trees_reused} reaproveitadas")
+        self.smote_skipped = cost.smote_skipped()
+        self.instrumentation.count('fitness.smote_skipped', self.smote_skipped)
+        if self.smote_skipped:
+            print(f"Aviso: SMOTE não aplicado em {self.smote_skipped} folds da validação cruzada "
+                  "(poucos exemplos da classe minoritária); esses folds foram treinados sem reamostragem.")
+        cache.save()
 
         best_n_estimators = max(1, int(best_params[0]))
         best_max_depth = max(10, int(best_params[1])) 
@@ -93,28 +771,55 @@ class FailurePredictor:
         self.best_params = {'n_estimators': best_n_estimators, 'max_depth': best_max_depth}
         print(f"PSO Otimizou Parâmetros: n_estimators={best_n_estimators}, max_depth={best_max_depth}")
 
+        if extended:
+            # Hiperparâmetros extras do melhor ponto do PSO (F2); a fronteira cobre todos os pontos avaliados
+            trial = cost.trial(cost.key(best_params))
+            extra = cost.params(cost.key(best_params))
+            self.best_params.update(min_samples_leaf=extra['min_samples_leaf'], max_features=extra['max_features'])
+            self.pareto_front = cost.pareto_front()
+            print(f"min_samples_leaf={extra['min_samples_leaf']}, max_features={extra['max_features']} "
+                  f"(OOF no limiar de maior F2 {trial['threshold']:.2f}: Recall {trial['recall']:.4f}, "
+                  f"{trial['alert_rate']:.1%} de alertas); fronteira de Pareto com {len(self.pareto_front)} pontos")
+            self._select_operating_point(cost)
+
+        best_n_estimators = self.best_params['n_estimators']
+        best_max_depth = self.best_params['max_depth']
+
         # TREINAMENTO FINAL COM SMOTE E PARÂMETROS OTIMIZADOS
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
         
         # APLICAÇÃO DO SMOTE APENAS NO CONJUNTO DE TREINO!
         print("Aplicando SMOTE para balanceamento...")
+        if stop_event is not None and stop_event.is_set():
+            raise OptimizationCancelled("Treinamento cancelado.")
+        if progress is not None:
+            progress({'stage': 'final_fit'})
         smote = SMOTE(random_state=42)
-        X_train_smote, y_train_smote = smote.fit_resample(X_train, y_train)
+        with self.instrumentation.stage('train.smote'):
+            X_train_smote, y_train_smote = smote.fit_resample(X_train, y_train)
+        self.instrumentation.count('train.smote_rows', X_train_smote.shape[0])
         
         # O Random Forest agora é treinado com os dados balanceados e parâmetros regularizados
         self.model = RandomForestClassifier(
             n_estimators=best_n_estimators,
             max_depth=best_max_depth,
             random_state=42,
-            n_jobs=-1,
+            n_jobs=plan.n_cores,
              # AUMENTO DE REGULARIZAÇÃO: Impede folhas com poucas amostras, suavizando a previsão
-            min_samples_leaf=5,
+            min_samples_leaf=self.best_params.get('min_samples_leaf', 5),
+            max_features=self.best_params.get('max_features', 'sqrt'),
             class_weight='balanced' 
         )
-        self.model.fit(X_train_smote, y_train_smote)
+        with self.instrumentation.stage('train.fit'):
+            self.model.fit(X_train_smote, y_train_smote)
 
         # AVALIAÇÃO DE DESEMPENHO E ARMAZENAMENTO DA IMPORTÂNCIA
-        y_pred = self.model.predict(X_test)
+        with self.instrumentation.stage('train.evaluate'):
+            if 'threshold' in self.best_params:
+                # Alerta no limiar otimizado (o mesmo usado no Ranking de Risco)
+                y_pred = (self.scorer().predict_proba(X_test) >= self.best_params['threshold']).astype(int)
+            else:
+                y_pred = self.model.predict(X_test)
         
         metrics = {
             'Accuracy': accuracy_score(y_test, y_pred),
@@ -124,9 +829,128 @@ class FailurePredictor:
         }
         
         self.feature_importances_ = self.model.feature_importances_
+        self.metrics = metrics
         
         return metrics
 
+    def _select_operating_point(self, cost):
+        # Limiar de alerta (e hiperparâmetros) escolhido na fronteira de Pareto pela regra explícita.
+        # Sem regra, o modelo não guarda limiar e o Ranking de Risco continua em DEFAULT_THRESHOLD.
+        if self.max_alert_rate is None and self.alert_cost_ratio is None:
+            print(f"Limiar de alerta: {DEFAULT_THRESHOLD:.2f} (padrão; use max_alert_rate ou alert_cost_ratio "
+                  "para escolher um na fronteira de Pareto)")
+            return
+        choice = cost.select_threshold(self.pareto_front, max_alert_rate=self.max_alert_rate,
+                                       cost_ratio=self.alert_cost_ratio)
+        if choice is None:
+            print(f"Aviso: nenhum ponto da fronteira tem no máximo {self.max_alert_rate:.1%} de alertas; "
+                  f"limiar padrão {DEFAULT_THRESHOLD:.2f} mantido.")
+            return
+        rule = ({'max_alert_rate': self.max_alert_rate} if self.max_alert_rate is not None
+                else {'alert_cost_ratio': self.alert_cost_ratio})
+        self.best_params = {
+            'n_estimators': choice['n_estimators'], 'max_depth': choice['max_depth'],
+            'min_samples_leaf': choice['min_samples_leaf'], 'max_features': choice['max_features'],
+            'threshold': choice['threshold'], 'threshold_rule': rule,
+        }
+        print(f"Ponto de operação ({', '.join(f'{k}={v}' for k, v in rule.items())}): "
+              f"n_estimators={choice['n_estimators']}, max_depth={choice['max_depth']}, "
+              f"min_samples_leaf={choice['min_samples_leaf']}, max_features={choice['max_features']}, "
+              f"limiar={choice['threshold']:.2f} (OOF: Recall {choice['recall']:.4f}, "
+              f"{choice['alert_rate']:.1%} de alertas)")
+
+    @staticmethod
+    def read_meta(path):
+        # Apenas o meta.json do artefato (parâmetros, métricas, limiar), sem a floresta nem o pré-processamento
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"Artefato de modelo não encontrado: {path}")
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        if meta.get('version') != ARTIFACT_VERSION:
+            raise ValueError(
+                f"Versão de artefato incompatível: {meta.get('version')} (esperada {ARTIFACT_VERSION})."
+            )
+        return meta
+
+    @staticmethod
+    def saved_threshold(path):
+        # Limiar de alerta de um artefato salvo (escolhido no treino ou o padrão do Ranking de Risco)
+        return FailurePredictor.read_meta(path)['best_params'].get('threshold', DEFAULT_THRESHOLD)
+
+    def save(self, path, preprocessing, feature_names, schema_hash):
+        # Salva o artefato versionado em um diretório: meta.json (parâmetros, layout e hash do esquema),
+        # model.joblib (floresta, sem compressão para permitir mmap) e preprocessing.joblib
+        # (StandardScaler, vocabulário do OneHotEncoder e features numéricas, ver DataLoader.preprocessing()).
+        # A fronteira de Pareto (centenas de pontos no espaço estendido) vai para pareto.json, fora do meta.json.
+        os.makedirs(path, exist_ok=True)
+        joblib.dump(self.model, os.path.join(path, 'model.joblib'))
+        joblib.dump(preprocessing, os.path.join(path, 'preprocessing.joblib'))
+
+        meta = {
+            'version': ARTIFACT_VERSION,
+            'best_params': self.best_params,
+            'feature_names': list(feature_names),
+            'schema_hash': schema_hash,
+            'metrics': self.metrics,
+            'pareto_points': None if self.pareto_front is None else len(self.pareto_front),
+            'feature_importances': None if self.feature_importances_ is None else list(map(float, self.feature_importances_)),
+        }
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        pareto_path = os.path.join(path, 'pareto.json')
+        if self.pareto_front is not None:
+            with open(pareto_path, 'w', encoding='utf-8') as f:
+                json.dump(self.pareto_front, f, ensure_ascii=False)
+        elif os.path.exists(pareto_path):
+            # Artefato regravado por um treino no espaço básico: não mantém a fronteira do anterior
+            os.remove(pareto_path)
+
+        self.preprocessing = preprocessing
+        self.feature_names = list(feature_names)
+        self.schema_hash = schema_hash
+
+    @classmethod
+    def load(cls, path, mmap_mode='r', instrumentation=None):
+        # Carrega um artefato salvo sem refazer PSO/SMOTE. Apenas meta.json e o pré-processamento são lidos agora;
+        # a floresta é carregada (memory-mapped) na primeira chamada de predict().
+        meta = cls.read_meta(path)
+
+        predictor = cls(instrumentation=instrumentation)
+        predictor.model = None
+        predictor._artifact_path = path
+        predictor._mmap_mode = mmap_mode
+        predictor.best_params = meta['best_params']
+        predictor.metrics = meta.get('metrics')
+        pareto_path = os.path.join(path, 'pareto.json')
+        if os.path.exists(pareto_path):
+            with open(pareto_path, 'r', encoding='utf-8') as f:
+                predictor.pareto_front = json.load(f)
+        predictor.feature_names = meta['feature_names']
+        predictor.schema_hash = meta['schema_hash']
+        if meta.get('feature_importances') is not None:
+            predictor.feature_importances_ = np.array(meta['feature_importances'])
+        predictor.preprocessing = joblib.load(os.path.join(path, 'preprocessing.joblib'))
+        return predictor
+
+    def iter_predict(self, X):
+        # Gerador de (início, probabilidades) por bloco de linhas: permite gravar o ranking em disco
+        # sem materializar as probabilidades de toda a frota de uma vez
+        scorer = self.scorer()
+        blocks = scorer.iter_proba(X)
+        while True:
+            with self.instrumentation.stage('predict.chunk'):
+                block = next(blocks, None)
+            if block is None:
+                return
+            self.instrumentation.count('predict.rows', len(block[1]))
+            yield block
+
     def predict(self, X):
         # Retorna a PROBABILIDADE da classe 1 (Falha) para ranqueamento de risco
-        return self.model.predict_proba(X)[:, 1]
\ No newline at end of file
+        with self.instrumentation.stage('predict'):
+            probabilities = np.empty(X.shape[0], dtype=np.float64)
+            for start, block in self.iter_predict(X):
+                probabilities[start:start + len(block)] = block
+        return probabilities
\ No newline at end of file
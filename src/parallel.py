@@ -0,0 +1,53 @@
+import os
+
+from threadpoolctl import threadpool_limits
+
+
+class ParallelPlan:
+    # Divisão do orçamento de núcleos entre os três níveis de paralelismo do treinamento:
+    # partículas do enxame (swarm), folds da validação cruzada (folds) e árvores da floresta (trees).
+    # O produto swarm * folds * trees nunca ultrapassa n_cores, evitando a sobrecarga da CPU.
+
+    def __init__(self, n_cores, swarm, folds, trees):
+        self.n_cores = n_cores
+        self.swarm = swarm
+        self.folds = folds
+        self.trees = trees
+
+    @property
+    def inner_threads(self):
+        # Núcleos disponíveis dentro de cada avaliação de fitness
+        return self.folds * self.trees
+
+    def limits(self):
+        # Limita os pools nativos (BLAS/OpenMP) ao orçamento de uma avaliação
+        return threadpool_limits(limits=self.inner_threads)
+
+    def as_dict(self):
+        return {'n_cores': self.n_cores, 'swarm': self.swarm, 'folds': self.folds, 'trees': self.trees}
+
+    def __repr__(self):
+        return (f"ParallelPlan(n_cores={self.n_cores}, swarm={self.swarm}, "
+                f"folds={self.folds}, trees={self.trees})")
+
+
+def plan_parallelism(n_cores=None, n_particles=1, n_folds=5, split=None):
+    # Distribui os núcleos priorizando o nível mais externo (partículas), que tem menor overhead;
+    # o que sobra vai para os folds e, por fim, para as árvores.
+    # split=(swarm, folds, trees) permite forçar uma divisão manual (ex.: benchmarks).
+    if n_cores is None or n_cores < 1:
+        n_cores = os.cpu_count() or 1
+
+    if split is not None:
+        swarm, folds, trees = (max(1, int(v)) for v in split)
+        if swarm * folds * trees > n_cores:
+            raise ValueError(
+                f"Divisão {swarm}x{folds}x{trees} excede o orçamento de {n_cores} núcleos."
+            )
+        return ParallelPlan(n_cores, swarm, folds, trees)
+
+    swarm = max(1, min(n_particles, n_cores))
+    remaining = n_cores // swarm
+    folds = max(1, min(n_folds, remaining))
+    trees = max(1, remaining // folds)
+    return ParallelPlan(n_cores, swarm, folds, trees)
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+# Limiar padrão de probabilidade para um envio entrar no Ranking de Risco (GUI e linha de comando)
+DEFAULT_THRESHOLD = 0.6
+
+
+class RiskRanking:
+    # Ranking de Risco pré-calculado: as probabilidades são ordenadas UMA vez (argsort) e a mesma ordem
+    # é reutilizada pela visualização paginada, pelo filtro de limiar e pela exportação.
+    # O número de alertas para um limiar é obtido por busca binária nas probabilidades ordenadas.
+
+    COLUNAS_CONTEXTO = ['Nº Série Equip.', 'Motivo']
+
+    def __init__(self, probabilities, context_cols):
+        probabilities = np.asarray(probabilities, dtype=float)
+        self.order = np.argsort(-probabilities, kind='stable')
+        self.sorted_probabilities = probabilities[self.order]
+        # Crescente (negado) para np.searchsorted
+        self._neg_sorted = -self.sorted_probabilities
+        self.context_cols = context_cols
+
+    def __len__(self):
+        return len(self.order)
+
+    def count_at(self, threshold):
+        # Quantidade de envios com probabilidade >= threshold (prefixo do ranking)
+        return int(np.searchsorted(self._neg_sorted, -threshold, side='right'))
+
+    def rows(self, start, stop):
+        # Materializa apenas as linhas [start, stop) do ranking: (probabilidade, nº série, motivo)
+        idx = self.order[start:stop]
+        context = self.context_cols[idx]
+        return [
+            (prob, serial, motivo)
+            for prob, (serial, motivo) in zip(self.sorted_probabilities[start:stop], context)
+        ]
+
+    def to_frame(self, threshold=None, prob_column='Probabilidade_Risco'):
+        # DataFrame ordenado por risco decrescente, opcionalmente só com os alertas (>= threshold)
+        stop = len(self) if threshold is None else self.count_at(threshold)
+        idx = self.order[:stop]
+        df = pd.DataFrame(self.context_cols[idx], columns=self.COLUNAS_CONTEXTO, index=idx)
+        df[prob_column] = self.sorted_probabilities[:stop]
+        return df
+
+
+class SerialRiskIndex:
+    # Ranking agregado por equipamento ('Nº Série Equip.'): uma linha por série em vez de uma por envio.
+    # O índice (pd.factorize, por hash) é montado UMA vez e todas as agregações são reduções vetorizadas
+    # por grupo (bincount/ufunc.at): risco máximo, risco do último envio, risco com decaimento, número de
+    # envios e último Motivo. As colunas de contexto vêm ordenadas por (série, data) do DataLoader, então
+    # o último envio de cada série é a sua última ocorrência.
+    # Risco com decaimento: média ponderada em que cada envio anterior da série pesa 'decay' vezes o seguinte.
+    # A seleção dos K maiores usa np.argpartition (O(séries)) e ordena apenas os K selecionados.
+
+    SCORES = ('max', 'latest', 'decayed')
+    COLUNAS = ['Nº Série Equip.', 'Envios', 'Último Motivo', 'Risco_Maximo', 'Risco_Ultimo_Envio', 'Risco_Decaido']
+
+    def __init__(self, probabilities, context_cols, score='max', decay=0.5):
+        if score not in self.SCORES:
+            raise ValueError(f"Agregação de risco inválida: {score!r} (use {', '.join(self.SCORES)}).")
+        probabilities = np.asarray(probabilities, dtype=float)
+        # Envios sem número de série formam um grupo próprio (NaN), em vez do código -1 do factorize
+        codes, self.serials = pd.factorize(context_cols[:, 0], use_na_sentinel=False)
+        n_serials = len(self.serials)
+        positions = np.arange(len(codes))
+
+        self.counts = np.bincount(codes, minlength=n_serials)
+        self.max_risk = np.full(n_serials, -np.inf)
+        np.maximum.at(self.max_risk, codes, probabilities)
+        last = np.zeros(n_serials, dtype=np.int64)
+        np.maximum.at(last, codes, positions)
+        self.latest_risk = probabilities[last]
+        self.last_motivo = context_cols[last, 1]
+
+        # Ordem de cada envio dentro da série (0 = primeiro), por ordenação estável dos códigos
+        order = np.argsort(codes, kind='stable')
+        starts = np.concatenate([[0], np.cumsum(self.counts)[:-1]])
+        ordinal = np.empty(len(codes), dtype=np.int64)
+        ordinal[order] = positions - starts[codes[order]]
+        weights = decay ** (self.counts[codes] - 1 - ordinal)
+        self.decayed_risk = (np.bincount(codes, weights=probabilities * weights, minlength=n_serials)
+                             / np.bincount(codes, weights=weights, minlength=n_serials))
+
+        self.score = score
+        self._top = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.serials)
+
+    @property
+    def values(self):
+        # Risco usado para ordenar e filtrar
+        return {'max': self.max_risk, 'latest': self.latest_risk, 'decayed': self.decayed_risk}[self.score]
+
+    def set_score(self, score):
+        if score not in self.SCORES:
+            raise ValueError(f"Agregação de risco inválida: {score!r} (use {', '.join(self.SCORES)}).")
+        if score != self.score:
+            self.score = score
+            self._top = np.empty(0, dtype=np.int64)
+
+    def count_at(self, threshold):
+        # Quantidade de equipamentos com risco >= threshold
+        return int(np.count_nonzero(self.values >= threshold))
+
+    def top(self, k):
+        # Índices dos k equipamentos de maior risco, em ordem decrescente (reaproveita a última seleção)
+        k = min(int(k), len(self))
+        if k > len(self._top):
+            values = self.values
+            if k < len(self):
+                candidates = np.argpartition(-values, k - 1)[:k]
+            else:
+                candidates = np.arange(len(self))
+            # Empates desempatados pela ordem das séries, como no sort estável do RiskRanking
+            self._top = candidates[np.lexsort((candidates, -values[candidates]))]
+        return self._top[:k]
+
+    def rows(self, start, stop):
+        # Linhas [start, stop) do ranking por equipamento: (risco, nº série, envios, último motivo)
+        idx = self.top(stop)[start:stop]
+        values = self.values
+        return [
+            (values[i], self.serials[i], int(self.counts[i]), self.last_motivo[i])
+            for i in idx
+        ]
+
+    def to_frame(self, threshold=None, top=None, prob_column='Probabilidade_Risco'):
+        # DataFrame por equipamento ordenado pelo risco escolhido, opcionalmente só com os que atingem
+        # o limiar e/ou apenas os 'top' primeiros
+        stop = len(self) if threshold is None else self.count_at(threshold)
+        if top is not None:
+            stop = min(stop, top)
+        idx = self.top(stop)
+        df = pd.DataFrame({
+            'Nº Série Equip.': np.asarray(self.serials)[idx],
+            'Envios': self.counts[idx],
+            'Último Motivo': self.last_motivo[idx],
+            'Risco_Maximo': self.max_risk[idx],
+            'Risco_Ultimo_Envio': self.latest_risk[idx],
+            'Risco_Decaido': self.decayed_risk[idx],
+        }, columns=self.COLUNAS)
+        df[prob_column] = self.values[idx]
+        return df
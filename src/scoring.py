@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+
+# Linhas por bloco na pontuação em lote (limita a memória de predict_proba em frotas grandes)
+DEFAULT_CHUNK_ROWS = 65_536
+
+
+def _tree_input(X):
+    # Converte o bloco UMA vez para o formato das árvores do scikit-learn (float32; CSR com índices int32),
+    # permitindo chamar predict_proba(check_input=False) em cada árvore sem revalidar a matriz
+    if sp.issparse(X):
+        X = sp.csr_matrix(X, dtype=np.float32)
+        X.indices = X.indices.astype(np.intc, copy=False)
+        X.indptr = X.indptr.astype(np.intc, copy=False)
+        return X
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+
+def _sklearn_leaf_sum(estimators, X, col):
+    # Soma das probabilidades positivas de um grupo de árvores (a travessia Cython libera o GIL)
+    X = _tree_input(X)
+    total = np.zeros(X.shape[0], dtype=np.float64)
+    for estimator in estimators:
+        total += estimator.predict_proba(X, check_input=False)[:, col]
+    return total
+
+
+class BatchScorer:
+    # Pontuação em lote de uma floresta treinada: X é processado em blocos de chunk_rows linhas
+    # (memória limitada) e os blocos de uma mesma "onda" são pontuados em paralelo (threads).
+    # Com menos blocos que n_jobs (X pequeno), o paralelismo passa para grupos de árvores.
+
+    def __init__(self, model, chunk_rows=DEFAULT_CHUNK_ROWS, n_jobs=None):
+        self.model = model
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.n_jobs = max(1, int(n_jobs or os.cpu_count() or 1))
+        classes = list(model.classes_)
+        self._col = classes.index(1) if 1 in classes else len(classes) - 1
+
+    def _tree_groups(self, n_chunks):
+        # Divide as árvores entre os núcleos que sobram depois de um bloco por núcleo
+        n_trees = len(self.model.estimators_)
+        n_groups = max(1, min(n_trees, self.n_jobs // max(1, n_chunks)))
+        return np.array_split(np.arange(n_trees), n_groups)
+
+    def _leaf_sum(self, X, trees):
+        return _sklearn_leaf_sum([self.model.estimators_[i] for i in trees], X, self._col)
+
+    def iter_proba(self, X):
+        # Gerador de (início, probabilidades) por bloco, na ordem das linhas de X.
+        # Apenas n_jobs blocos estão em memória ao mesmo tempo.
+        if sp.issparse(X):
+            X = X.tocsr()
+        n_rows = X.shape[0]
+        n_trees = len(self.model.estimators_)
+        starts = list(range(0, n_rows, self.chunk_rows))
+        with Parallel(n_jobs=self.n_jobs, backend='threading') as parallel:
+            for wave in range(0, len(starts), self.n_jobs):
+                wave_starts = starts[wave:wave + self.n_jobs]
+                groups = self._tree_groups(len(wave_starts))
+                tasks = [(start, trees) for start in wave_starts for trees in groups]
+                if self.n_jobs == 1 or len(tasks) == 1:
+                    sums = [self._leaf_sum(X[start:start + self.chunk_rows], trees) for start, trees in tasks]
+                else:
+                    sums = parallel(
+                        delayed(self._leaf_sum)(X[start:start + self.chunk_rows], trees) for start, trees in tasks
+                    )
+                for i, start in enumerate(wave_starts):
+                    partial = sums[i * len(groups):(i + 1) * len(groups)]
+                    yield start, np.sum(partial, axis=0) / n_trees
+
+    def predict_proba(self, X):
+        # Probabilidades positivas de todas as linhas (pré-alocadas; os blocos são preenchidos em ordem)
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start, proba in self.iter_proba(X):
+            out[start:start + len(proba)] = proba
+        return out
@@ -2,30 +2,51 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import numpy as np
 import os
-import pandas as pd
+import queue
+import threading
 from operator import itemgetter 
 
 # Importações relativas para a estrutura do projeto
 try:
     from src.data_loader import DataLoader
-    from src.model import FailurePredictor
+    from src.dataset_cache import DEFAULT_CACHE_DIR
+    from src.feature_store import SerialFeatureStore
+    from src.model import FailurePredictor, OptimizationCancelled
+    from src.inference import score_loader
+    from src.instrumentation import Instrumentation
+    from src.ranking import DEFAULT_THRESHOLD, RiskRanking, SerialRiskIndex
 except ImportError:
     import sys
     sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
     from src.data_loader import DataLoader
-    from src.model import FailurePredictor
+    from src.dataset_cache import DEFAULT_CACHE_DIR
+    from src.feature_store import SerialFeatureStore
+    from src.model import FailurePredictor, OptimizationCancelled
+    from src.inference import score_loader
+    from src.instrumentation import Instrumentation
+    from src.ranking import DEFAULT_THRESHOLD, RiskRanking, SerialRiskIndex
 
 
 class App:
 
     # Interface Gráfica Tkinter para previsão de falhas (Ranking de Risco)
+
+    # Intervalo (ms) de consulta da fila de progresso do treinamento em segundo plano
+    POLL_MS = 100
+    # Linhas por página na janela do Ranking de Risco
+    PAGE_SIZE = 100
+    # Etapas exibidas no resumo de tempos após o treinamento
+    PROFILE_TOP = 8
+
     def __init__(self, root):
         self.root = root
         self.root.title("Predição de Falhas com PSO - TI")
         self.csv_path = None
+        # Store de features por série (opcional): carregado, atualizado e salvo a cada CSV aberto
+        self.feature_store_path = None
         
         window_width = 450
-        window_height = 400
+        window_height = 620
         screen_width = root.winfo_screenwidth()
         screen_height = root.winfo_screenheight()
         center_x = int(screen_width/2 - window_width/2)
@@ -34,17 +55,38 @@ class App:
         
         self.setup_ui()
         self.model = FailurePredictor()
+        # Fechar a janela também fecha o log estruturado (grava o resumo final)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Variáveis do Data Loader
+        self.loader = None
         self.X = None
         self.y = None
         self.feature_names = None
         self.context_cols = None # NOVO: Array com [Nº Série, Motivo]
+        # Tempos por etapa acumulados desde a carga do CSV (PIPELINE_LOG/PIPELINE_PROFILE ligam log e cProfile)
+        self.instrumentation = None
         
         # Variáveis do Modelo
         self.predictions = None # Armazenará probabilidades (float)
+        self.ranking = None # Ranking ordenado (src/ranking.py), recalculado só quando as previsões mudam
+        self.ranking_source = None
+        # Ranking por equipamento (uma linha por Nº Série), ligado pela opção "Agrupar por equipamento"
+        self.serial_index = None
+        self.serial_index_source = None
+        self.group_by_serial = False
+        # Agregação do risco por equipamento escolhida na janela do ranking (vale também para a exportação)
+        self.serial_score = 'max'
         self.metrics = None
-        self.THRESHOLD = 0.6# Limiar de classificação para Alerta (P > 0.7)
+        self.THRESHOLD = DEFAULT_THRESHOLD # Limiar de classificação para Alerta (P >= 0.6)
+
+        # Treinamento em segundo plano (thread + fila de progresso + cancelamento)
+        self.training_thread = None
+        self.progress_queue = None
+        self.stop_event = None
+        self.training_objective = None
+        # Estado dos botões de ação e dos resumos antes do treinamento (restaurado ao cancelar ou em erro)
+        self.pre_training_state = None
 
     def setup_ui(self):
         # Cria e organiza os widgets da interface.
@@ -60,11 +102,21 @@ class App:
         self.load_btn.pack(fill='x', pady=2)
         self.status_label = tk.Label(main_frame, text="Nenhum arquivo carregado.", fg="red")
         self.status_label.pack(anchor='w')
+        self.store_btn = tk.Button(main_frame, text="Store de Features por Série (opcional)", command=self.select_feature_store, relief=tk.RAISED)
+        self.store_btn.pack(fill='x', pady=2)
+        self.store_label = tk.Label(main_frame, text="Sem store: features calculadas só com o CSV.", fg="gray")
+        self.store_label.pack(anchor='w')
 
         # 2. Treinar e Prever
         tk.Label(main_frame, text="2. Otimizar e Treinar o Modelo:").pack(anchor='w', pady=(5, 2))
         self.predict_btn = tk.Button(main_frame, text="Treinar e Prever", command=self.run_model, state=tk.DISABLED, bg="#2196F3", fg="white", relief=tk.RAISED)
         self.predict_btn.pack(fill='x', pady=2)
+        self.load_model_btn = tk.Button(main_frame, text="Prever com Modelo Salvo (sem PSO)", command=self.run_saved_model, state=tk.DISABLED, bg="#607D8B", fg="white", relief=tk.RAISED)
+        self.load_model_btn.pack(fill='x', pady=2)
+        self.cancel_btn = tk.Button(main_frame, text="Cancelar Treinamento", command=self.cancel_training, state=tk.DISABLED, bg="#F44336", fg="white", relief=tk.RAISED)
+        self.cancel_btn.pack(fill='x', pady=2)
+        self.progress_label = tk.Label(main_frame, text="", fg="gray")
+        self.progress_label.pack(anchor='w')
 
         # 3. Resultado Principal
         tk.Label(main_frame, text="3. Resumo da Previsão:", font=('Arial', 10, 'bold')).pack(anchor='w', pady=(5, 2))
@@ -80,6 +132,30 @@ class App:
         tk.Label(main_frame, text="5. Ações:", font=('Arial', 10, 'bold')).pack(anchor='w', pady=(5, 2))
         self.export_btn = tk.Button(main_frame, text="Exportar Ranking de Risco (CSV)", command=self.export_alerts, state=tk.DISABLED, bg="#FF9800", fg="white", relief=tk.RAISED)
         self.export_btn.pack(fill='x', pady=2)
+        self.save_model_btn = tk.Button(main_frame, text="Salvar Modelo Treinado", command=self.save_model, state=tk.DISABLED, bg="#795548", fg="white", relief=tk.RAISED)
+        self.save_model_btn.pack(fill='x', pady=2)
+
+    def on_close(self):
+        # Interrompe um treinamento em andamento e fecha a instrumentação antes de destruir a janela
+        if self.stop_event is not None:
+            self.stop_event.set()
+        if self.instrumentation is not None:
+            self.instrumentation.close()
+        self.root.destroy()
+
+    def select_feature_store(self):
+        # Escolhe (ou cria) o arquivo do store; os próximos CSVs abertos atualizam o histórico por série
+        path = filedialog.asksaveasfilename(
+            title="Store de features por série",
+            defaultextension=".pkl",
+            filetypes=[("Store de features", "*.pkl")],
+            confirmoverwrite=False
+        )
+        if not path:
+            return
+        self.feature_store_path = path
+        estado = "existente" if os.path.exists(path) else "novo"
+        self.store_label.config(text=f"Store ({estado}): {os.path.basename(path)}", fg="green")
 
     def load_csv(self):
         # Abre o diálogo de arquivo e carrega os dados (Recebendo 4 variáveis).
@@ -89,70 +165,217 @@ class App:
         )
         if self.csv_path:
             try:
-                loader = DataLoader(self.csv_path)
+                # Novo CSV, nova medição: o log da carga anterior é fechado (com o seu resumo) antes
+                if self.instrumentation is not None:
+                    self.instrumentation.close()
+                self.instrumentation = Instrumentation.from_env()
+                # Reabrir o mesmo CSV usa o cache em disco (X/y mapeados em memória, sem reprocessar)
+                store = SerialFeatureStore.open(self.feature_store_path) if self.feature_store_path else None
+                loader = DataLoader(self.csv_path, instrumentation=self.instrumentation, cache_dir=DEFAULT_CACHE_DIR,
+                                    feature_store=store)
                 
                 # ATUALIZADO: Recebe 4 variáveis do load()
                 self.X, self.y, self.feature_names, self.context_cols = loader.load()
-                
-                # Carrega o DF original (apenas para referência na exportação)
-                try:
-                    self.original_df = pd.read_csv(self.csv_path, encoding='utf-8', on_bad_lines='skip')
-                except UnicodeDecodeError:
-                    self.original_df = pd.read_csv(self.csv_path, encoding='latin1', on_bad_lines='skip')
+                self.loader = loader
+                if store is not None:
+                    store.save(self.feature_store_path)
 
-                if self.X.size == 0 or self.y.size == 0:
+                if self.X.shape[0] == 0 or self.y.size == 0:
                     raise ValueError("Os dados carregados estão vazios ou incompletos.")
 
                 messagebox.showinfo("Sucesso", f"CSV carregado com {self.X.shape[0]} registros!")
                 self.status_label.config(text=f"Arquivo: {os.path.basename(self.csv_path)}", fg="green")
                 self.predict_btn.config(state=tk.NORMAL)
+                self.load_model_btn.config(state=tk.NORMAL)
                 self.export_btn.config(state=tk.DISABLED)
+                self.save_model_btn.config(state=tk.DISABLED)
                 self.metrics_label.config(text="Aguardando treinamento...", fg="gray")
             except Exception as e:
                 messagebox.showerror("Erro de Carregamento", str(e))
                 self.status_label.config(text="Erro ao carregar o arquivo.", fg="red")
                 self.predict_btn.config(state=tk.DISABLED)
+                self.load_model_btn.config(state=tk.DISABLED)
 
-    def show_predictions(self, probabilities):
-        # Cria uma nova janela e exibe o Ranking de Risco (Probabilidade > 0.7).
-        
-        # 1. Cria um DataFrame de trabalho a partir das colunas de contexto e probabilidades
-        df_ranking = pd.DataFrame(self.context_cols, columns=['Nº Série Equip.', 'Motivo'])
-        df_ranking['Probabilidade'] = probabilities
-        
-        # 2. Filtra apenas os alertas (Probabilidade > THRESHOLD)
-        df_alerts = df_ranking[df_ranking['Probabilidade'] >= self.THRESHOLD].copy()
-        
-        # 3. ORDENAÇÃO: Ranking decrescente pela probabilidade de falha
-        df_alerts = df_alerts.sort_values(by='Probabilidade', ascending=False)
-        
-        falhas_count = len(df_alerts)
+    def save_model(self):
+        # Salva o modelo treinado (floresta, parâmetros do PSO, scaler e layout de colunas) em um diretório.
+        if self.predictions is None or self.loader is None or self.loader.encoder is None:
+            messagebox.showwarning("Aviso", "Por favor, treine o modelo primeiro.")
+            return
 
-        if falhas_count == 0:
-            messagebox.showinfo("Resultado da Previsão", "Nenhuma falha foi predita (probabilidade abaixo do limiar de 70%).")
+        output_dir = filedialog.askdirectory(title="Escolha o diretório do modelo")
+        if not output_dir:
             return
+        try:
+            self.model.save(
+                output_dir,
+                preprocessing=self.loader.preprocessing(),
+                feature_names=self.loader.feature_names,
+                schema_hash=self.loader.schema_hash()
+            )
+            messagebox.showinfo("Sucesso", f"Modelo salvo em:\n{output_dir}")
+        except Exception as e:
+            messagebox.showerror("Erro ao Salvar", f"Falha ao salvar o modelo: {e}")
+
+    def run_saved_model(self):
+        # Pontua o CSV carregado com um modelo salvo, sem refazer PSO, SMOTE e o treinamento final.
+        if self.loader is None:
+            messagebox.showwarning("Aviso", "Por favor, carregue o arquivo CSV primeiro.")
+            return
+
+        model_dir = filedialog.askdirectory(title="Selecione o diretório do modelo salvo")
+        if not model_dir:
+            return
+        try:
+            self.model = FailurePredictor.load(model_dir, instrumentation=self.instrumentation)
+            self.predictions = score_loader(self.model, self.loader)
+            # Limiar otimizado do artefato (espaço de busca estendido), quando existir
+            self.THRESHOLD = self.model.threshold
+            self.feature_names = self.model.feature_names
+
+            falhas_count = int(np.sum(self.predictions >= self.THRESHOLD))
+            self.result_label.config(
+                text=f"Modelo salvo aplicado. {falhas_count} alertas de risco (Prob. >= {self.THRESHOLD:.0%}) preditos.",
+                fg="blue"
+            )
+            if self.model.metrics:
+                self.metrics = self.model.metrics
+                self.metrics_label.config(
+                    text=(f"Acurácia: {self.metrics['Accuracy']:.4f} | Precisão: {self.metrics['Precision']:.4f}\n"
+                          f"Recall: {self.metrics['Recall']:.4f} | F1-Score: {self.metrics['F1-Score']:.4f}"),
+                    fg="black"
+                )
+
+            self.show_predictions(self.predictions)
+            self.export_btn.config(state=tk.NORMAL)
+            self.save_model_btn.config(state=tk.DISABLED)
+        except Exception as e:
+            messagebox.showerror("Erro de Processamento", f"Falha ao aplicar o modelo salvo: {e}")
+            self.result_label.config(text="Erro de processamento.", fg="red")
+
+    def _get_ranking(self, probabilities=None):
+        # Ranking ordenado uma única vez por conjunto de previsões (reusado pela janela e pela exportação)
+        if probabilities is None:
+            probabilities = self.predictions
+        if self.ranking is None or self.ranking_source is not probabilities:
+            self.ranking = RiskRanking(probabilities, self.context_cols)
+            self.ranking_source = probabilities
+        return self.ranking
+
+    def _get_serial_index(self, probabilities=None):
+        # Índice por equipamento montado uma única vez por conjunto de previsões (janela e exportação)
+        if probabilities is None:
+            probabilities = self.predictions
+        if self.serial_index is None or self.serial_index_source is not probabilities:
+            self.serial_index = SerialRiskIndex(probabilities, self.context_cols, score=self.serial_score)
+            self.serial_index_source = probabilities
+        self.serial_index.set_score(self.serial_score)
+        return self.serial_index
+
+    def show_predictions(self, probabilities):
+        # Cria uma nova janela e exibe o Ranking de Risco (Probabilidade >= THRESHOLD).
+        # Paginada: só as linhas da página visível são inseridas no Treeview. O controle deslizante
+        # refiltra o limiar por busca binária nas probabilidades já ordenadas.
+        # Sem alertas no limiar atual a janela abre assim mesmo (página vazia): baixar o limiar no controle
+        # deslizante é justamente o que o usuário precisa para ver os envios de maior risco.
+        ranking = self._get_ranking(probabilities)
+        falhas_count = ranking.count_at(self.THRESHOLD)
 
         result_window = tk.Toplevel(self.root)
         result_window.title(f"🏆 RANKING DE RISCO - {falhas_count} Equipamentos Prioritários")
         
-        cols_display = ['Probabilidade', 'Nº Série Equip.', 'Motivo']
+        cols_display = ['Probabilidade', 'Nº Série Equip.', 'Envios', 'Motivo']
         
-        tree = ttk.Treeview(result_window, columns=cols_display, show='headings')
+        # Controles: limiar e paginação
+        controls = tk.Frame(result_window)
+        controls.pack(fill='x', padx=5, pady=5)
+        threshold_var = tk.DoubleVar(value=self.THRESHOLD)
+        tk.Label(controls, text="Limiar de risco:").pack(side=tk.LEFT)
+        tk.Scale(controls, variable=threshold_var, from_=0.0, to=1.0, resolution=0.01, orient=tk.HORIZONTAL, length=200).pack(side=tk.LEFT)
+        prev_btn = tk.Button(controls, text="◀ Anterior")
+        prev_btn.pack(side=tk.LEFT, padx=5)
+        next_btn = tk.Button(controls, text="Próxima ▶")
+        next_btn.pack(side=tk.LEFT)
+        page_label = tk.Label(controls, text="")
+        page_label.pack(side=tk.LEFT, padx=10)
+
+        # Agrupamento por equipamento: risco máximo, do último envio ou com decaimento
+        group_var = tk.BooleanVar(value=self.group_by_serial)
+        tk.Checkbutton(controls, text="Agrupar por equipamento", variable=group_var).pack(side=tk.LEFT, padx=5)
+        score_labels = {'Risco máximo': 'max', 'Último envio': 'latest', 'Com decaimento': 'decayed'}
+        score_var = tk.StringVar(value={v: k for k, v in score_labels.items()}[self.serial_score])
+        ttk.Combobox(controls, textvariable=score_var, values=list(score_labels), state='readonly',
+                     width=15).pack(side=tk.LEFT)
+
+        tree = ttk.Treeview(result_window, columns=cols_display, show='headings', height=self.PAGE_SIZE // 4)
         tree.pack(expand=True, fill='both')
         
         tree.heading('Probabilidade', text='Risco (%)')
         tree.column('Probabilidade', width=100, anchor=tk.CENTER)
         tree.heading('Nº Série Equip.', text='Nº Série Equip.')
         tree.column('Nº Série Equip.', width=150, anchor=tk.CENTER)
+        tree.heading('Envios', text='Envios')
+        tree.column('Envios', width=70, anchor=tk.CENTER)
         tree.heading('Motivo', text='Motivo Original')
         tree.column('Motivo', width=300)
 
-        for index, row_data in df_alerts.iterrows():
-            probabilidade_percentual = f"{row_data['Probabilidade']:.2%}"
-            num_serie = row_data['Nº Série Equip.']
-            motivo = row_data['Motivo']
-            
-            tree.insert('', tk.END, values=(probabilidade_percentual, num_serie, motivo))
+        state = {'page': 0, 'count': falhas_count}
+
+        def source():
+            # Ranking por envio ou por equipamento, conforme a opção de agrupamento
+            if not self.group_by_serial:
+                return ranking
+            self.serial_score = score_labels[score_var.get()]
+            return self._get_serial_index(probabilities)
+
+        state['count'] = source().count_at(self.THRESHOLD)
+
+        def render():
+            n_pages = max(1, -(-state['count'] // self.PAGE_SIZE))
+            state['page'] = min(state['page'], n_pages - 1)
+            start = state['page'] * self.PAGE_SIZE
+            stop = min(start + self.PAGE_SIZE, state['count'])
+
+            tree.delete(*tree.get_children())
+            if self.group_by_serial:
+                tree.config(displaycolumns=cols_display)
+                tree.heading('Motivo', text='Último Motivo')
+                for probabilidade, num_serie, envios, motivo in source().rows(start, stop):
+                    tree.insert('', tk.END, values=(f"{probabilidade:.2%}", num_serie, envios, motivo))
+            else:
+                tree.config(displaycolumns=['Probabilidade', 'Nº Série Equip.', 'Motivo'])
+                tree.heading('Motivo', text='Motivo Original')
+                for probabilidade, num_serie, motivo in ranking.rows(start, stop):
+                    tree.insert('', tk.END, values=(f"{probabilidade:.2%}", num_serie, '', motivo))
+
+            unidade = 'equipamentos' if self.group_by_serial else 'alertas'
+            if state['count'] == 0:
+                page_label.config(text=f"0 {unidade} com risco >= {self.THRESHOLD:.0%} (reduza o limiar)")
+            else:
+                page_label.config(text=f"Página {state['page'] + 1}/{n_pages} | {state['count']} {unidade}")
+            prev_btn.config(state=tk.NORMAL if state['page'] > 0 else tk.DISABLED)
+            next_btn.config(state=tk.NORMAL if state['page'] < n_pages - 1 else tk.DISABLED)
+            result_window.title(f"🏆 RANKING DE RISCO - {state['count']} Equipamentos Prioritários")
+
+        def change_page(delta):
+            state['page'] += delta
+            render()
+
+        def change_threshold(*_):
+            # Novo limiar (ou agrupamento) vale também para o resumo e para a exportação
+            self.THRESHOLD = round(threshold_var.get(), 2)
+            self.group_by_serial = group_var.get()
+            state['count'] = source().count_at(self.THRESHOLD)
+            state['page'] = 0
+            render()
+            unidade = 'equipamentos' if self.group_by_serial else 'alertas'
+            self.result_label.config(text=f"{state['count']} {unidade} de risco (Prob. >= {self.THRESHOLD:.0%}).", fg="blue")
+
+        prev_btn.config(command=lambda: change_page(-1))
+        next_btn.config(command=lambda: change_page(1))
+        threshold_var.trace_add('write', change_threshold)
+        group_var.trace_add('write', change_threshold)
+        score_var.trace_add('write', change_threshold)
+        render()
 
     def export_alerts(self):
         # Exporta o Ranking de Risco (Probabilidades > THRESHOLD) para um novo CSV.
@@ -161,15 +384,12 @@ class App:
             return
 
         try:
-            # 1. Cria DF de trabalho
-            df_work = pd.DataFrame(self.context_cols, columns=['Nº Série Equip.', 'Motivo'])
-            df_work['Probabilidade_Risco'] = self.predictions
-            
-            # 2. Filtra pelo Limiar (THRESHOLD)
-            df_alerts = df_work[df_work['Probabilidade_Risco'] >= self.THRESHOLD].copy()
-            
-            # 3. Ordena para o Ranking
-            df_alerts = df_alerts.sort_values(by='Probabilidade_Risco', ascending=False)
+            # Reutiliza o ranking já ordenado e filtra pelo Limiar (THRESHOLD) por busca binária;
+            # agrupado, exporta uma linha por equipamento (mesma agregação da janela do ranking)
+            if self.group_by_serial:
+                df_alerts = self._get_serial_index().to_frame(self.THRESHOLD)
+            else:
+                df_alerts = self._get_ranking().to_frame(self.THRESHOLD)
             
             if len(df_alerts) == 0:
                 messagebox.showinfo("Exportação", "Nenhum equipamento atingiu o limiar de risco para exportação.")
@@ -179,12 +399,13 @@ class App:
             output_path = filedialog.asksaveasfilename(
                 defaultextension=".csv",
                 filetypes=[("Arquivos CSV", "*.csv")],
-                initialfile="Ranking_Risco_PSO.csv"
+                initialfile="Ranking_Risco_Equipamentos.csv" if self.group_by_serial else "Ranking_Risco_PSO.csv"
             )
 
             if output_path:
-                # Formata a coluna de probabilidade para % antes de salvar
-                df_alerts['Probabilidade_Risco'] = df_alerts['Probabilidade_Risco'].apply(lambda x: f'{x:.4f}')
+                # Formata as colunas de probabilidade para % antes de salvar
+                for col in [c for c in df_alerts.columns if c.startswith(('Probabilidade_', 'Risco_'))]:
+                    df_alerts[col] = df_alerts[col].apply(lambda x: f'{x:.4f}')
                 
                 df_alerts.to_csv(output_path, index=False)
                 messagebox.showinfo("Sucesso", f"Ranking de Risco exportado com sucesso para:\n{output_path}")
@@ -194,20 +415,152 @@ class App:
 
 
     def run_model(self):
-        #Executa o treinamento do modelo (com PSO) e faz a previsão de PROBABILIDADE.
+        #Executa o treinamento do modelo (com PSO) em segundo plano e faz a previsão de PROBABILIDADE.
+        # A janela continua responsiva: o progresso chega por uma fila consultada com root.after().
         if self.X is None or self.y is None:
             messagebox.showwarning("Aviso", "Por favor, carregue o arquivo CSV primeiro.")
             return
+        if self.training_thread is not None and self.training_thread.is_alive():
+            return
+
+        self.result_label.config(text="Treinando e Otimizando (Aguarde)...", fg="orange")
+        self.metrics_label.config(text="Calculando métricas e importâncias...", fg="orange")
+        self.progress_label.config(text="Iniciando otimização por PSO...")
+        self._set_training_state(True)
+
+        # Um modelo salvo carregado anteriormente é substituído por um novo treinamento
+        model = FailurePredictor(instrumentation=self.instrumentation)
+        # Rótulo do progresso: o best_score do PSO é 1 - objetivo do espaço de busca do modelo
+        self.training_objective = model.objective
+        self.progress_queue = queue.Queue()
+        self.stop_event = threading.Event()
+        self.training_thread = threading.Thread(
+            target=self._train_worker,
+            args=(model, self.X, self.y, self.progress_queue, self.stop_event),
+            daemon=True
+        )
+        self.training_thread.start()
+        self.root.after(self.POLL_MS, self._poll_training)
+
+    def cancel_training(self):
+        # Pede ao enxame que pare na próxima checagem (entre avaliações do PSO)
+        if self.stop_event is not None:
+            self.stop_event.set()
+            self.cancel_btn.config(state=tk.DISABLED)
+            self.progress_label.config(text="Cancelando...")
+
+    def _set_training_state(self, training):
+        estado = tk.DISABLED if training else tk.NORMAL
+        if training:
+            self.pre_training_state = {
+                'export': self.export_btn.cget('state'),
+                'save_model': self.save_model_btn.cget('state'),
+                'result': (self.result_label.cget('text'), self.result_label.cget('fg')),
+                'metrics': (self.metrics_label.cget('text'), self.metrics_label.cget('fg')),
+            }
+        self.load_btn.config(state=estado)
+        self.predict_btn.config(state=estado)
+        self.load_model_btn.config(state=estado)
+        self.cancel_btn.config(state=tk.NORMAL if training else tk.DISABLED)
+        if training:
+            self.export_btn.config(state=tk.DISABLED)
+            self.save_model_btn.config(state=tk.DISABLED)
 
+    def _restore_pre_training_state(self):
+        # Treinamento cancelado ou com erro: o modelo e as previsões anteriores continuam valendo,
+        # então exportar/salvar e os resumos voltam a ser como antes do treinamento
+        previous = self.pre_training_state
+        if previous is None:
+            return
+        self.export_btn.config(state=previous['export'])
+        self.save_model_btn.config(state=previous['save_model'])
+        self.result_label.config(text=previous['result'][0], fg=previous['result'][1])
+        self.metrics_label.config(text=previous['metrics'][0], fg=previous['metrics'][1])
+
+    @staticmethod
+    def _train_worker(model, X, y, events, stop_event):
+        # Executado na thread de treinamento: NÃO acessa widgets Tk, apenas publica eventos na fila.
         try:
-            self.result_label.config(text="Treinando e Otimizando (Aguarde)...", fg="orange")
-            self.metrics_label.config(text="Calculando métricas e importâncias...", fg="orange")
-            self.root.update() 
+            with model.instrumentation.profiled():
+                metrics = model.train(X, y, progress=events.put, stop_event=stop_event)
+                events.put({'stage': 'predict'})
+                predictions = model.predict(X)
+            events.put({'stage': 'done', 'model': model, 'metrics': metrics, 'predictions': predictions})
+        except OptimizationCancelled:
+            events.put({'stage': 'cancelled'})
+        except Exception as e:
+            events.put({'stage': 'error', 'error': e})
 
-            self.metrics = self.model.train(self.X, self.y)
+    def _poll_training(self):
+        # Consome os eventos da thread de treinamento e atualiza a interface (thread principal do Tk).
+        try:
+            while True:
+                event = self.progress_queue.get_nowait()
+                stage = event['stage']
+                if stage == 'pso':
+                    self.progress_label.config(text=(
+                        f"PSO: iteração {event['iteration']}/{event['max_iter']} | "
+                        f"Melhor {self.training_objective}: {1 - event['best_score']:.4f} | "
+                        f"Avaliações: {event['evaluations']} | ETA: {event['eta']:.0f}s"
+                    ))
+                elif stage == 'final_fit':
+                    self.progress_label.config(text="Aplicando SMOTE e treinando o modelo final...")
+                elif stage == 'predict':
+                    self.progress_label.config(text="Calculando probabilidades...")
+                elif stage == 'done':
+                    self._set_training_state(False)
+                    self.progress_label.config(text="")
+                    self._finish_training(event['model'], event['metrics'], event['predictions'])
+                    return
+                elif stage == 'cancelled':
+                    self._set_training_state(False)
+                    self._restore_pre_training_state()
+                    self.progress_label.config(text="Treinamento cancelado pelo usuário.")
+                    return
+                elif stage == 'error':
+                    self._set_training_state(False)
+                    self._restore_pre_training_state()
+                    self.progress_label.config(text="Falha no treinamento (modelo anterior mantido).")
+                    messagebox.showerror("Erro de Processamento", f"Falha ao treinar ou prever: {event['error']}")
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(self.POLL_MS, self._poll_training)
 
-            # Faz a PREVISÃO EM PROBABILIDADES
-            self.predictions = self.model.predict(self.X)
+    def _pso_stop_text(self):
+        # Quantas iterações o PSO realmente executou e por que parou (convergência, orçamento ou max_iter)
+        history = self.model.pso_history
+        if not history:
+            return ""
+        motivos = {
+            'stagnation': "sem melhora do melhor global",
+            'diameter': "enxame colapsado",
+            'score_variance': "pontuações idênticas",
+            'time_budget': "orçamento de tempo",
+            'evaluation_budget': "orçamento de avaliações",
+            'max_iter': "limite de iterações",
+        }
+        return (f"PSO encerrado na iteração {history['iterations'][-1]} "
+                f"({motivos.get(history['stop_reason'], history['stop_reason'])}), "
+                f"{history['evaluations'][-1]} avaliações")
+
+    def _extended_params_text(self):
+        # Hiperparâmetros extras e limiar do espaço de busca estendido (vazio no espaço básico)
+        params = self.model.best_params
+        if 'min_samples_leaf' not in params:
+            return ""
+        front = self.model.pareto_front or []
+        limiar = f", Limiar: {params['threshold']:.0%}" if 'threshold' in params else ""
+        return (f"Min_Samples_Leaf: {params['min_samples_leaf']}, Max_Features: {params['max_features']}{limiar}\n"
+                f"Fronteira de Pareto: {len(front)} combinações (Recall x alertas x custo de treino)\n")
+
+    def _finish_training(self, model, metrics, predictions):
+        # Exibe os resultados do treinamento concluído em segundo plano.
+        try:
+            self.model = model
+            self.metrics = metrics
+            self.predictions = predictions
+            self.THRESHOLD = self.model.threshold
             
             # Classificação binária baseada no THRESHOLD para o resumo
             falhas_binarias = (self.predictions >= self.THRESHOLD).astype(int)
@@ -233,8 +586,11 @@ class App:
             
                 messagebox.showinfo("Resultados Detalhados", 
                                     f"Parâmetros Otimizados (PSO):\n"
-                                    f"N_Estimators: {self.model.best_params['n_estimators']}, Max_Depth: {self.model.best_params['max_depth']}\n\n"
-                                    f"{top_features_text}")
+                                    f"N_Estimators: {self.model.best_params['n_estimators']}, Max_Depth: {self.model.best_params['max_depth']}\n"
+                                    f"{self._extended_params_text()}"
+                                    f"{self._pso_stop_text()}\n\n"
+                                    f"{top_features_text}\n\n"
+                                    f"Tempo por Etapa:\n{self.model.instrumentation.format_summary(top=self.PROFILE_TOP)}")
             
             # --- 2. Atualiza Resultado Principal e Ações ---
             result_text = f"Otimização Concluída. {falhas_count} alertas de risco (Prob. >= {self.THRESHOLD:.0%}) preditos."
@@ -242,9 +598,11 @@ class App:
             
             self.show_predictions(self.predictions)
             self.export_btn.config(state=tk.NORMAL)
+            self.save_model_btn.config(state=tk.NORMAL)
                 
         except Exception as e:
             messagebox.showerror("Erro de Processamento", f"Falha ao treinar ou prever: {e}")
             self.result_label.config(text="Erro de processamento.", fg="red")
             self.metrics_label.config(text="Falha ao calcular.", fg="red")
-            self.export_btn.config(state=tk.DISABLED)
\ No newline at end of file
+            self.export_btn.config(state=tk.DISABLED)
+            self.save_model_btn.config(state=tk.DISABLED)